@@ -132,3 +132,15 @@ REST_FRAMEWORK = {
         'rest_framework.filters.OrderingFilter',
     ],
 }
+
+# Rows validated and written per transaction by the bulk book import (api.bulk)
+BOOK_BULK_CHUNK_SIZE = 1000
+
+# Books inlined per author by the author endpoints; None inlines them all.
+# A request can lower or raise it with ?books=N
+AUTHOR_INLINE_BOOKS = None
+
+# Paginated book list (api.pagination): seconds a filtered list's count is cached,
+# and the table size from which an unfiltered list uses the database's row estimate
+LIST_COUNT_CACHE_TIMEOUT = 60
+LIST_COUNT_ESTIMATE_MIN = 100000
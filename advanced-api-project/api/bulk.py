@@ -0,0 +1,157 @@
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+from .models import Author, Book
+from .serializers import BookRowSerializer
+
+# Bulk book import used by BookBulkUpsertView.
+# Rows arrive as a JSON array or an NDJSON stream and are handled a chunk at a time
+# (BOOK_BULK_CHUNK_SIZE rows): every row in the chunk is validated by BookRowSerializer,
+# author ids and author names are each resolved with a single IN query, and the valid
+# rows are written with one bulk_create(update_conflicts=True) inside a transaction.
+# Rows carrying an "id" update that book and rows without one are inserted; an id
+# with no book behind it is an error, never a client-chosen primary key. Invalid rows
+# are skipped and reported by their position in the input; a row whose id comes
+# again later in its chunk is reported as superseded by that row.
+
+MAX_REPORTED_ERRORS = 1000
+
+
+def chunk_size():
+    return getattr(settings, 'BOOK_BULK_CHUNK_SIZE', 1000)
+
+
+def ndjson_rows(lines):
+    """Rows of an NDJSON stream; a line that is not valid JSON is passed on as text."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            # Rejected with the serializer's "expected a dictionary" error
+            yield line.decode('utf-8', 'replace') if isinstance(line, bytes) else line
+
+
+def upsert_options():
+    options = {'update_conflicts': True, 'update_fields': ['title', 'publication_year', 'author']}
+    # MySQL's ON DUPLICATE KEY UPDATE always targets the primary key and takes no column list
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['id']
+    return options
+
+
+def upsert_chunk(rows, start, report):
+    # Each row goes through the same validation as ListSerializer applies to its
+    # items, carrying on past invalid rows instead of rejecting the whole chunk
+    serializer = BookRowSerializer(many=True).child
+    checked = []
+    for offset, row in enumerate(rows):
+        try:
+            checked.append((start + offset, serializer.run_validation(row)))
+        except ValidationError as exc:
+            report.error(start + offset, as_serializer_error(exc))
+
+    # One IN query each for the author ids and names the chunk refers to
+    author_ids = set(Author.objects.filter(
+        id__in={row['author'] for _, row in checked if 'author' in row}
+    ).values_list('id', flat=True))
+    authors_by_name = {}
+    for author_id, name in Author.objects.filter(
+        name__in={row['author_name'] for _, row in checked if 'author_name' in row}
+    ).values_list('id', 'name'):
+        authors_by_name.setdefault(name, []).append(author_id)
+
+    resolved = []
+    for index, row in checked:
+        if 'author' in row:
+            author_id = row['author'] if row['author'] in author_ids else None
+            if author_id is None:
+                report.error(index, {'author': ['Unknown author.']})
+                continue
+        else:
+            matches = authors_by_name.get(row['author_name'], [])
+            if len(matches) != 1:
+                report.error(index, {'author_name': ['Unknown author.' if not matches else 'Ambiguous author name.']})
+                continue
+            author_id = matches[0]
+        resolved.append((index, Book(
+            id=row.get('id'), title=row['title'], publication_year=row['publication_year'], author_id=author_id,
+        )))
+    if not resolved:
+        return
+
+    with transaction.atomic():
+        # Rows with an id update that book, which must exist; the ids are locked so
+        # none of them can be deleted, and then re-inserted by the upsert, meanwhile
+        ids = {book.id for _, book in resolved if book.id is not None}
+        existing = set(
+            Book.objects.select_for_update().filter(id__in=ids).values_list('id', flat=True)
+        ) if ids else set()
+        books = {}
+        for index, book in resolved:
+            if book.id is None:
+                books[('new', index)] = (index, book)
+                continue
+            if book.id not in existing:
+                report.error(index, {'id': ['No book with this id.']})
+                continue
+            if book.id in books:
+                # One statement cannot write the same row twice; the later row wins
+                report.supersede(books[book.id][0], index)
+            books[book.id] = (index, book)
+        if not books:
+            return
+        Book.objects.bulk_create([book for _, book in books.values()], **upsert_options())
+    updated = sum(1 for key in books if key in existing)
+    report.updated += updated
+    report.created += len(books) - updated
+
+
+class ImportReport:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors = []
+        # Valid rows replaced by a later row with the same id in their chunk
+        self.superseded = []
+
+    def error(self, row, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row, 'errors': errors})
+
+    def supersede(self, row, by_row):
+        if len(self.superseded) < MAX_REPORTED_ERRORS:
+            self.superseded.append({'row': row, 'by': by_row})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'updated': self.updated,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+            'superseded': self.superseded,
+        }
+
+
+def import_books(rows):
+    """Validate and upsert an iterable of book rows chunk by chunk; returns an ImportReport."""
+    report = ImportReport()
+    rows = iter(rows)
+    start = 0
+    size = chunk_size()
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            break
+        upsert_chunk(chunk, start, report)
+        start += len(chunk)
+    return report
@@ -1,9 +1,17 @@
 from django.db import models
+from django.db.models.functions import Lower
 
 # Create your models here.
 class Author(models.Model):
     name = models.CharField(max_length=255)
 
+    class Meta:
+        indexes = [
+            # ?author__name= equality, and the prefix search of api.filters
+            models.Index(fields=['name'], name='author_name_idx'),
+            models.Index(Lower('name'), name='author_name_lower_idx'),
+        ]
+
     def __str__(self):
         return self.name
     
@@ -12,5 +20,15 @@ class Book(models.Model):
     publication_year = models.IntegerField()
     author = models.ForeignKey(Author, related_name='books', on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            # ?publication_year= and ?ordering=publication_year, with id as the tie-breaker
+            models.Index(fields=['publication_year', 'id'], name='book_year_id_idx'),
+            # ?title= and ?ordering=title
+            models.Index(fields=['title'], name='book_title_idx'),
+            # Prefix search on title (see api.filters)
+            models.Index(Lower('title'), name='book_title_lower_idx'),
+        ]
+
     def __str__(self):
         return self.title
\ No newline at end of file
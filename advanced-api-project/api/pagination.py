@@ -0,0 +1,167 @@
+import hashlib
+from functools import partial
+from urllib import parse
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import SearchFilter
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+# Page-number pagination without a COUNT(*) on every page.
+# The total is read from the cache, keyed by the view and its normalized filter
+# parameters (so ?a=1&b=2 and ?b=2&a=1&page=3 share one entry), and only counted
+# when missing. Only the parameters the view's filterset and search read go into the
+# key; anything else in the query string cannot change the count, and so cannot be
+# used to fill the cache with entries of its own. An unfiltered list takes the database's own row estimate instead
+# (MySQL's information_schema, PostgreSQL's pg_class) once the table is large enough
+# for COUNT(*) to hurt. Counts may lag writes by up to LIST_COUNT_CACHE_TIMEOUT.
+# ?count=false leaves the count out altogether for infinite scroll: the page is read
+# with one extra row, which says whether there is a next page.
+
+
+def count_timeout():
+    return getattr(settings, 'LIST_COUNT_CACHE_TIMEOUT', 60)
+
+
+def estimate_threshold():
+    return getattr(settings, 'LIST_COUNT_ESTIMATE_MIN', 100000)
+
+
+def estimated_count(queryset):
+    """The database's estimate of the rows in the queryset's table, or None."""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == 'mysql':
+        sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+    elif connection.vendor == 'postgresql':
+        # -1 until the table has been analyzed
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(%s)'
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < estimate_threshold():
+        # Small tables count exactly, and cheaply
+        return None
+    return int(row[0])
+
+
+class CountedPaginator(Paginator):
+    """A Paginator taking its count from `count_function` rather than COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count_function, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_function = count_function
+
+    @cached_property
+    def count(self):
+        return self.count_function()
+
+
+class CachedCountPagination(PageNumberPagination):
+    # Pages only when asked to with ?page_size=, unless PAGE_SIZE is set
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    count_query_param = 'count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.counted = request.query_params.get(self.count_query_param, '').lower() not in ('0', 'false', 'no')
+        if not self.counted:
+            return self.paginate_without_count(queryset, request)
+        self.django_paginator_class = partial(
+            CountedPaginator, count_function=lambda: self.get_count(queryset, request, view),
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page = request.query_params.get(self.page_query_param, '1')
+        self.page_number = int(page) if page.isdigit() else 0
+        if self.page_number < 1:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page, message='That page number is not a positive integer.',
+            ))
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(results) > page_size
+        return results[:page_size]
+
+    def filter_param_names(self, queryset, view):
+        """The query parameters that decide which rows the view lists."""
+        names = set()
+        for backend_class in getattr(view, 'filter_backends', ()):
+            backend = backend_class()
+            if hasattr(backend, 'get_filterset_class'):
+                filterset_class = backend.get_filterset_class(view, queryset)
+                if filterset_class is not None:
+                    names.update(filterset_class.base_filters)
+            elif isinstance(backend, SearchFilter):
+                names.add(backend.search_param)
+        # Ordering and the pagination parameters never change the count
+        return names
+
+    def filter_params(self, queryset, request, view):
+        names = self.filter_param_names(queryset, view)
+        return sorted(
+            (name, sorted(values))
+            for name, values in request.query_params.lists()
+            if name in names and any(values)
+        )
+
+    def count_cache_key(self, queryset, request, view):
+        owner = f'{type(view).__module__}.{type(view).__qualname__}' if view else queryset.model._meta.label
+        params = parse.urlencode(self.filter_params(queryset, request, view), doseq=True)
+        return f'list_count:{owner}:{hashlib.md5(params.encode()).hexdigest()}'
+
+    def get_count(self, queryset, request, view):
+        key = self.count_cache_key(queryset, request, view)
+        count = cache.get(key)
+        if count is None:
+            if not self.filter_params(queryset, request, view) and not queryset.query.where:
+                count = estimated_count(queryset)
+            if count is None:
+                count = queryset.count()
+            cache.set(key, count, count_timeout())
+        return count
+
+    def get_paginated_response(self, data):
+        if self.counted:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['required'] = ['results']
+        return response_schema
+
+    def get_next_link(self):
+        if self.counted:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.counted:
+            return super().get_previous_link()
+        if self.page_number == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
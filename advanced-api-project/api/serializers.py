@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from django.db.models import Count, Prefetch
 from .models import Author, Book
 import datetime
 
@@ -13,9 +14,47 @@ class BookSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Publication year cannot be in the future.")
         return value
     
+class BookRowSerializer(BookSerializer):
+    # One row of a bulk import (api.bulk). The author is given by id or by name and
+    # resolved for a whole chunk at once, so neither is looked up here.
+    id = serializers.IntegerField(min_value=1, required=False)
+    author = serializers.IntegerField(required=False)
+    author_name = serializers.CharField(required=False)
+
+    class Meta(BookSerializer.Meta):
+        fields = BookSerializer.Meta.fields + ['author_name']
+
+    def validate(self, data):
+        if ('author' in data) == ('author_name' in data):
+            raise serializers.ValidationError({'author': ['Give exactly one of author (id) or author_name.']})
+        return data
+
 class AuthorSerializer(serializers.ModelSerializer):
-    books = BookSerializer(many=True, read_only=True)
+    book_count = serializers.SerializerMethodField()
+    books = serializers.SerializerMethodField()
 
     class Meta:
         model = Author
-        fields = ['id', 'name', 'books']
\ No newline at end of file
+        fields = ['id', 'name', 'book_count', 'books']
+
+    @staticmethod
+    def setup_eager_loading(queryset, books_limit=None):
+        # Books are counted in the author query and inlined with one prefetch query for
+        # the whole page, oldest first; a limit keeps only each author's first N books.
+        books = Book.objects.order_by('publication_year', 'id')
+        if books_limit is not None:
+            books = books[:books_limit]
+        return queryset.annotate(book_count=Count('books')).prefetch_related(
+            Prefetch('books', queryset=books, to_attr='inlined_books')
+        )
+
+    def get_book_count(self, author):
+        count = getattr(author, 'book_count', None)
+        return count if count is not None else author.books.count()
+
+    def get_books(self, author):
+        books = getattr(author, 'inlined_books', None)
+        if books is None:
+            # Not loaded through setup_eager_loading
+            books = author.books.order_by('publication_year', 'id')
+        return BookSerializer(books, many=True).data
\ No newline at end of file
@@ -1,7 +1,16 @@
+import csv
+import io
+import json
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth.models import User
 from rest_framework import status
+from .filters import prefix_end
 from .models import Book, Author
+from unittest import skipUnless
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 class BookAPITestCase(APITestCase):
@@ -78,3 +87,221 @@ class BookAPITestCase(APITestCase):
     def test_order_books(self):
         response = self.client.get(f"{self.list_url}?ordering=publication_year")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class BookExportTestCase(APITestCase):
+    def setUp(self):
+        self.author = Author.objects.create(name="Jane Roe")
+        self.other = Author.objects.create(name="John Doe")
+        for year in (2001, 1999, 2005):
+            Book.objects.create(title=f"Book {year}", author=self.author, publication_year=year)
+        Book.objects.create(title="Elsewhere", author=self.other, publication_year=2010)
+        self.list_url = reverse("book-list")
+
+    def export(self, **params):
+        response = self.client.get(self.list_url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    def test_ndjson_export_honours_filters_and_ordering(self):
+        body = self.export(format="ndjson", author__name="Jane Roe", ordering="publication_year")
+        rows = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([row["publication_year"] for row in rows], [1999, 2001, 2005])
+        self.assertEqual(set(rows[0]), {"id", "title", "publication_year", "author"})
+
+    def test_csv_export_with_search(self):
+        body = self.export(format="csv", search="Elsewhere")
+        rows = list(csv.reader(io.StringIO(body)))
+        self.assertEqual(rows[0], ["id", "title", "publication_year", "author"])
+        self.assertEqual(rows[1][1:], ["Elsewhere", "2010", str(self.other.id)])
+        self.assertEqual(len(rows), 2)
+
+
+@override_settings(BOOK_BULK_CHUNK_SIZE=2)
+class BookBulkUpsertTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="importer", password="password")
+        self.client.force_authenticate(self.user)
+        self.author = Author.objects.create(name="Jane Roe")
+        self.book = Book.objects.create(title="Old Title", author=self.author, publication_year=2000)
+        self.url = reverse("book-bulk")
+
+    def test_json_array_upserts_and_reports_bad_rows(self):
+        rows = [
+            {"id": self.book.id, "title": "New Title", "publication_year": 2001, "author": self.author.id},
+            {"title": "By Name", "publication_year": 1999, "author_name": "Jane Roe"},
+            {"title": "Future", "publication_year": 3000, "author": self.author.id},
+            {"title": "Nobody", "publication_year": 1999, "author_name": "Nobody"},
+            {"title": "Fresh", "publication_year": 2010, "author": self.author.id},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            (response.data["created"], response.data["updated"], response.data["failed"]), (2, 1, 2)
+        )
+        self.assertEqual([error["row"] for error in response.data["errors"]], [2, 3])
+        self.assertIn("publication_year", response.data["errors"][0]["errors"])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "New Title")
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_rows_are_validated_by_the_serializer(self):
+        rows = [
+            {"id": self.book.id, "title": "First", "publication_year": 2001, "author": self.author.id},
+            {"id": self.book.id, "title": "Second", "publication_year": 2002, "author": self.author.id},
+            {"title": "x" * 300, "publication_year": 2001, "author": self.author.id},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual((response.data["updated"], response.data["failed"]), (1, 1))
+        self.assertEqual(
+            response.data["errors"][0]["errors"]["title"], ["Ensure this field has no more than 255 characters."]
+        )
+        self.assertEqual(response.data["superseded"], [{"row": 0, "by": 1}])
+        self.book.refresh_from_db()
+        self.assertEqual(self.book.title, "Second")
+
+    def test_unknown_id_is_an_error(self):
+        missing = self.book.id + 100
+        rows = [
+            {"id": missing, "title": "Ghost", "publication_year": 2001, "author": self.author.id},
+            {"title": "New", "publication_year": 2002, "author": self.author.id},
+        ]
+        response = self.client.post(self.url, rows, format="json")
+        self.assertEqual((response.data["created"], response.data["failed"]), (1, 1))
+        self.assertEqual(response.data["errors"], [{"row": 0, "errors": {"id": ["No book with this id."]}}])
+        self.assertFalse(Book.objects.filter(id=missing).exists())
+
+    def test_ndjson_stream(self):
+        lines = [
+            json.dumps({"title": f"Book {i}", "publication_year": 2000 + i, "author_name": "Jane Roe"})
+            for i in range(5)
+        ] + ["not json"]
+        response = self.client.generic(
+            "POST", self.url, "\n".join(lines), content_type="application/x-ndjson"
+        )
+        self.assertEqual((response.data["created"], response.data["failed"]), (5, 1))
+        self.assertEqual(Book.objects.filter(title__startswith="Book ").count(), 5)
+
+    def test_rejects_non_array_json(self):
+        response = self.client.post(self.url, {"title": "Single"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AuthorAPITestCase(APITestCase):
+    def setUp(self):
+        for i in range(3):
+            author = Author.objects.create(name=f"Author {i}")
+            for year in (2003, 2001, 2002):
+                Book.objects.create(title=f"{author.name} {year}", author=author, publication_year=year)
+        self.list_url = reverse("author-list")
+
+    def test_list_costs_two_queries(self):
+        for i in range(20):
+            Author.objects.create(name=f"Extra {i}")
+        # authors with book counts, then the books of the whole page
+        with self.assertNumQueries(2):
+            response = self.client.get(self.list_url, {"page_size": 1000})
+        first = response.data["results"][0]
+        self.assertEqual(first["book_count"], 3)
+        self.assertEqual([book["publication_year"] for book in first["books"]], [2001, 2002, 2003])
+
+    def test_inlined_books_can_be_capped(self):
+        response = self.client.get(self.list_url, {"books": 1})
+        self.assertTrue(all(len(author["books"]) == 1 and author["book_count"] == 3 for author in response.data["results"]))
+        self.assertEqual(self.client.get(self.list_url, {"books": "x"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keyset_pages(self):
+        response = self.client.get(self.list_url, {"page_size": 2})
+        names = [author["name"] for author in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        names += [author["name"] for author in response.data["results"]]
+        self.assertEqual(names, ["Author 0", "Author 1", "Author 2"])
+        self.assertIsNone(response.data["next"])
+
+    def test_detail(self):
+        author = Author.objects.get(name="Author 1")
+        response = self.client.get(reverse("author-detail", kwargs={"pk": author.pk}), {"books": 2})
+        self.assertEqual((response.data["book_count"], len(response.data["books"])), (3, 2))
+
+
+@skipUnless(connection.vendor == "sqlite", "reads SQLite's EXPLAIN QUERY PLAN")
+class BookListQueryPlanTestCase(APITestCase):
+    # Every filtered list request must read its tables through an index search.
+    # A "SCAN" step is a full scan of a table, or of a whole index.
+    requests = [
+        {"title": "Book"},
+        {"author__name": "Jane Roe"},
+        {"publication_year": 2001},
+        {"publication_year": 2001, "ordering": "publication_year"},
+        {"search": "bo"},
+        {"search": "jane book"},
+        {"title": "Book", "ordering": "title"},
+    ]
+
+    def setUp(self):
+        author = Author.objects.create(name="Jane Roe")
+        Book.objects.create(title="Book", author=author, publication_year=2001)
+
+    def plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_list_filters_use_indexes(self):
+        for params in self.requests:
+            with self.subTest(params=params), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse("book-list"), params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.data), 1)
+            # SQLite logs the statement with its parameters quoted inline
+            [sql] = [query["sql"] for query in queries.captured_queries if '"api_book"' in query["sql"]]
+            for step in self.plan(sql):
+                with self.subTest(params=params, step=step):
+                    self.assertNotRegex(step, r"^SCAN ")
+
+    def test_search_matches_prefixes_case_insensitively(self):
+        def titles(search):
+            return [book["title"] for book in self.client.get(reverse("book-list"), {"search": search}).data]
+
+        self.assertEqual(titles("JAN"), ["Book"])
+        self.assertEqual(titles("roe"), [])
+        self.assertEqual(titles("jane\U0010ffff"), [])
+
+    def test_prefix_end(self):
+        self.assertEqual(prefix_end("abc"), "abd")
+        self.assertEqual(prefix_end("a\U0010ffff"), "b")
+        self.assertEqual(prefix_end("\ud7ff"), "\ue000")
+        self.assertIsNone(prefix_end("\U0010ffff"))
+
+
+class BookPaginationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        author = Author.objects.create(name="Jane Roe")
+        for year in range(2000, 2005):
+            Book.objects.create(title=f"Book {year}", author=author, publication_year=year)
+        self.list_url = reverse("book-list")
+
+    def test_count_is_cached_per_filter(self):
+        response = self.client.get(self.list_url, {"page_size": 2, "author__name": "Jane Roe"})
+        self.assertEqual(response.data["count"], 5)
+        Book.objects.filter(publication_year=2000).delete()
+        # Same filters in another order, another page: the page query only
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url + "?page=2&author__name=Jane+Roe&page_size=2&ordering=title")
+        self.assertEqual(response.data["count"], 5)
+        self.assertEqual(self.client.get(self.list_url, {"page_size": 2, "publication_year": 2001}).data["count"], 1)
+        # Parameters no filter reads share the entry rather than making their own
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, {"page_size": 2, "author__name": "Jane Roe", "utm_source": "x"})
+        self.assertEqual(response.data["count"], 5)
+
+    def test_without_count(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, {"page_size": 2, "page": 2, "count": "false", "ordering": "publication_year"})
+        self.assertNotIn("count", response.data)
+        self.assertEqual([book["publication_year"] for book in response.data["results"]], [2002, 2003])
+        self.assertIn("page=3", response.data["next"])
+        self.assertIsNone(self.client.get(response.data["next"]).data["next"])
+        self.assertEqual(self.client.get(self.list_url, {"page_size": 2, "page": 0, "count": "false"}).status_code, status.HTTP_404_NOT_FOUND)
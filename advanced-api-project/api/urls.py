@@ -1,10 +1,14 @@
 from django.urls import path
-from .views import (BookListView, BookDetailView, BookCreateView, BookUpdateView, BookDeleteView)
+from .views import (BookListView, BookDetailView, BookCreateView, BookUpdateView, BookDeleteView, BookBulkUpsertView,
+                    AuthorListView, AuthorDetailView)
 
 urlpatterns = [
     path('books/', BookListView.as_view(), name='book-list'),
     path('books/<int:pk>/', BookDetailView.as_view(), name='book-detail'),
     path('books/create/', BookCreateView.as_view(), name='book-create'),
+    path('books/bulk/', BookBulkUpsertView.as_view(), name='book-bulk'),
     path('books/update/', BookUpdateView.as_view(), name='book-create'),
     path('books/delete', BookDeleteView.as_view(), name='book-delete'),
+    path('authors/', AuthorListView.as_view(), name='author-list'),
+    path('authors/<int:pk>/', AuthorDetailView.as_view(), name='author-detail'),
 ]
\ No newline at end of file
@@ -1,8 +1,18 @@
 from django.shortcuts import render
 from rest_framework import generics
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
-from .models import Book
-from .serializers import BookSerializer
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from .models import Author, Book
+from .serializers import AuthorSerializer, BookSerializer
+from .exports import StreamingExportMixin
+from .filters import PrefixSearchFilter
+from .pagination import CachedCountPagination
+from .bulk import import_books, ndjson_rows
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
 # from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework import filters
 # from django_filters.rest_framework import DjangoFilterBackend
@@ -10,22 +20,43 @@ from django_filters import rest_framework
 
 # Create your views here.
 # ListView - Retrieve all books.
-class BookListView(generics.ListAPIView):
+# ?format=ndjson / ?format=csv stream the whole filtered list instead (see api.exports).
+# ?page_size=N pages it, with a cached count; add ?count=false to skip the count (see api.pagination).
+class BookListView(StreamingExportMixin, generics.ListAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = CachedCountPagination
+    export_filename = 'books'
 
 
     # Add filtering, searching, and ordering backends
-    filter_backends = [rest_framework.DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Every filter, search and ordering below is served by an index (see api.models)
+    filter_backends = [rest_framework.DjangoFilterBackend, PrefixSearchFilter, filters.OrderingFilter]
 
-    # Filter by title, author name, and year
+    # Filter by title, author name, and year (equality lookups)
     filterset_fields =['title', 'author__name', 'publication_year']
 
+    # Prefix search: ?search=tol finds "Tolstoy", not "Pistol"
     search_fields = ['title', 'author__name']
 
     ordering_fields = ['title', 'publication_year']
 
+# BulkUpsertView - Create or update many books per request (see api.bulk).
+# Send a JSON array, or NDJSON with Content-Type: application/x-ndjson for large imports.
+class BookBulkUpsertView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        if request.content_type.startswith('application/x-ndjson'):
+            # Read the body line by line instead of parsing it whole
+            rows = ndjson_rows(request._request)
+        else:
+            rows = request.data
+            if not isinstance(rows, list):
+                return Response({'detail': 'Expected a JSON array of books.'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(import_books(rows).as_dict(), status=status.HTTP_200_OK)
+
 # DetailView - Retrieve a single book by ID.
 class BookDetailView(generics.RetrieveAPIView):
     queryset = Book.objects.all()
@@ -48,4 +79,40 @@ class BookUpdateView(generics.UpdateAPIView):
 class BookDeleteView(generics.DestroyAPIView):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
-    permission_classes = [IsAuthenticated]
\ No newline at end of file
+    permission_classes = [IsAuthenticated]
+
+# Author endpoints: books are counted and inlined without a query per author.
+class AuthorPagination(CursorPagination):
+    # Keyset pagination on id: no COUNT and no OFFSET, whatever the page
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+class AuthorQuerysetMixin:
+    """?books=N caps how many books are inlined per author (default AUTHOR_INLINE_BOOKS)."""
+
+    def get_books_limit(self):
+        limit = self.request.query_params.get('books')
+        if limit is None:
+            return getattr(settings, 'AUTHOR_INLINE_BOOKS', None)
+        try:
+            return max(int(limit), 0)
+        except ValueError:
+            raise ValidationError({'books': 'A valid integer is required.'})
+
+    def get_queryset(self):
+        return AuthorSerializer.setup_eager_loading(Author.objects.all(), self.get_books_limit())
+
+# AuthorListView - Authors with their book counts and books.
+class AuthorListView(AuthorQuerysetMixin, generics.ListAPIView):
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = AuthorPagination
+    filter_backends = [filters.SearchFilter]
+    search_fields = ['name']
+
+# AuthorDetailView - One author with their book count and books.
+class AuthorDetailView(AuthorQuerysetMixin, generics.RetrieveAPIView):
+    serializer_class = AuthorSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
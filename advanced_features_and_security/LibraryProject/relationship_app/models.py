@@ -1,8 +1,5 @@
 from django.db import models
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-
 from django.conf import settings
 
 
@@ -54,15 +51,17 @@ class UserProfile(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - {self.role}"
-    
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
-
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
+
+    @classmethod
+    def for_user(cls, user):
+        # `user` is a bookshelf.CustomUser. Its profile is created here on first use,
+        # or by backfill_user_profiles, never by a post_save signal on the user
+        try:
+            return user.userprofile
+        except cls.DoesNotExist:
+            profile, _ = cls.objects.get_or_create(user=user)
+            user.userprofile = profile
+            return profile
 
 # Implement a custom user manager that handles user creation and queries, ensuring it can manage the added fields effectively.
 
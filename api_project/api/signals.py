@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_cache
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.evict(instance.key)
+
+@receiver(post_init, sender=settings.AUTH_USER_MODEL)
+def remember_token_auth_state(sender, instance, **kwargs):
+    instance._token_auth_state = token_auth_state(instance)
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def evict_tokens_of_saved_user(sender, instance, created, **kwargs):
+    # The cached token carries a copy of the user row; drop it when the user loses
+    # access through it, i.e. on a password or is_active change. Other saves
+    # (last_login, profile fields, ...) neither query the tokens nor evict them.
+    state = token_auth_state(instance)
+    changed = state != getattr(instance, '_token_auth_state', None)
+    instance._token_auth_state = state
+    if created or not changed:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        token_cache.evict(key)
+
+def token_auth_state(user):
+    # Read from __dict__ so deferred fields are not loaded just for this
+    return (user.__dict__.get('password'), user.__dict__.get('is_active'))
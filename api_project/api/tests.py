@@ -1,3 +1,26 @@
+from django.contrib.auth.models import User
 from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from .authentication import CachedTokenAuthentication, token_cache
 
 # Create your tests here.
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_warm_cache_skips_the_database(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_rotated_token_is_evicted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        Token.objects.create(user=self.user)
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
@@ -0,0 +1,28 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from relationship_app.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = "Create the missing UserProfile rows for existing users, in bulk."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        missing = User.objects.filter(userprofile__isnull=True).order_by('pk')
+        created = 0
+        while True:
+            # Each pass re-reads the users still without a profile, so the loop ends
+            # even if profiles are created concurrently
+            user_ids = list(missing.values_list('pk', flat=True)[:options['batch_size']])
+            if not user_ids:
+                break
+            # ignore_conflicts skips the users given a profile by UserProfile.for_user
+            # since the read above; count only the rows actually inserted
+            existing = UserProfile.objects.filter(user_id__in=user_ids).count()
+            UserProfile.objects.bulk_create(
+                [UserProfile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True
+            )
+            created += len(user_ids) - existing
+        self.stdout.write(self.style.SUCCESS(f"Created {created} user profiles."))
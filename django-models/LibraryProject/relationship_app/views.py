@@ -12,6 +12,7 @@ from django.contrib.auth.decorators import permission_required
 
 from .models import Book
 from .models import Library
+from .models import UserProfile
 
 from .forms import BookForm
 
@@ -58,13 +59,13 @@ class register(View):
     
 # Role Based Views
 def is_admin(user):
-    return user.userprofile.role == 'Admin'
+    return user.is_authenticated and UserProfile.for_user(user).role == 'Admin'
 
 def is_librarian(user):
-    return user.userprofile.role == 'Librarian'
+    return user.is_authenticated and UserProfile.for_user(user).role == 'Librarian'
 
 def is_member(user):
-    return user.userprofile.role == 'Member'
+    return user.is_authenticated and UserProfile.for_user(user).role == 'Member'
 
 @user_passes_test(is_admin)
 def admin_view(request):
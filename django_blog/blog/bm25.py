@@ -0,0 +1,106 @@
+import math
+import re
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, FloatField, Value, When
+from django.db.models.functions import Cast
+from .models import Post, SearchPosting, SearchTerm
+
+# BM25 for blog.search, over the inverted index in SearchTerm (`document_count`: the
+# number of posts containing the term) and SearchPosting (`frequency` of the term in
+# the post), with each post's indexed word count in Post.search_length. Tag facets
+# are postings too, so a post's terms include its "tag:<slug>" terms.
+
+TOKEN_RE = re.compile(r'\w+')
+# Term-frequency saturation and length normalization
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text, max_length):
+    """Lowercased word tokens of `text`, as indexed and as searched."""
+    return [token for token in TOKEN_RE.findall(text.lower()) if 1 < len(token) <= max_length]
+
+
+def corpus_stats(cache_key, timeout):
+    # (number of posts, average indexed length), refreshed every `timeout` seconds
+    stats = cache.get(cache_key)
+    if stats is None:
+        totals = Post.objects.aggregate(documents=Count('id'), length=Avg('search_length'))
+        stats = (totals['documents'], totals['length'] or 1.0)
+        cache.set(cache_key, stats, timeout)
+    return stats
+
+
+def idf(documents, document_count):
+    # Inverse document frequency as in Lucene's BM25: always positive
+    documents = max(documents, document_count)
+    return math.log(1 + (documents - document_count + 0.5) / (document_count + 0.5))
+
+
+def score(document_counts, documents, average_length):
+    """
+    BM25 contribution of one (post, term) row of a join through search_postings;
+    Sum() it per post. `document_counts` is {term id: document_count} of the matched terms.
+    """
+    term_idf = Case(
+        *[
+            When(search_postings__term_id=term_id, then=Value(idf(documents, count)))
+            for term_id, count in document_counts.items()
+        ],
+        output_field=FloatField(),
+    )
+    frequency = Cast('search_postings__frequency', FloatField())
+    length_norm = Value(K1 * (1 - B)) + Value(K1 * B / average_length) * Cast('search_length', FloatField())
+    return term_idf * frequency * Value(K1 + 1) / (frequency + length_norm)
+
+
+@transaction.atomic
+def update_postings(post, frequencies, length):
+    """
+    Bring the postings of `post` in line with {term: frequency} and store its `length`;
+    returns the terms it gained or lost, for blog.tags to invalidate.
+    """
+    current = {
+        posting.term.term: posting
+        for posting in SearchPosting.objects.filter(post=post).select_related('term')
+    }
+
+    added = [term for term in frequencies if term not in current]
+    removed = [posting for term, posting in current.items() if term not in frequencies]
+    changed = []
+    for term, posting in current.items():
+        if term in frequencies and posting.frequency != frequencies[term]:
+            posting.frequency = frequencies[term]
+            changed.append(posting)
+
+    if added:
+        SearchTerm.objects.bulk_create([SearchTerm(term=term) for term in added], ignore_conflicts=True)
+        term_ids = dict(SearchTerm.objects.filter(term__in=added).values_list('term', 'id'))
+        SearchPosting.objects.bulk_create([
+            SearchPosting(term_id=term_ids[term], post=post, frequency=frequencies[term]) for term in added
+        ])
+        SearchTerm.objects.filter(id__in=term_ids.values()).update(document_count=F('document_count') + 1)
+    if removed:
+        SearchPosting.objects.filter(id__in=[posting.id for posting in removed]).delete()
+        SearchTerm.objects.filter(id__in=[posting.term_id for posting in removed]).update(
+            document_count=F('document_count') - 1
+        )
+    if changed:
+        SearchPosting.objects.bulk_update(changed, ['frequency'])
+
+    if post.search_length != length:
+        # Queryset update: saving the post here would re-enter its post_save hook
+        Post.objects.filter(pk=post.pk).update(search_length=length)
+        post.search_length = length
+    return added + [posting.term.term for posting in removed]
+
+
+def remove_postings(post):
+    """Take `post` out of the term counts before it is deleted; returns its terms."""
+    # The postings themselves go with the post through the cascade
+    terms = SearchTerm.objects.filter(postings__post=post)
+    removed = list(terms.values_list('term', flat=True))
+    terms.update(document_count=F('document_count') - 1)
+    return removed
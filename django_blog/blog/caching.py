@@ -0,0 +1,106 @@
+import hashlib
+import time
+import uuid
+from abc import ABC, abstractmethod
+
+from django.core.cache import cache
+from django.db.models import Max
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from .models import Comment, Post
+
+# Whole-page caching for anonymous readers.
+#
+# Every cached page depends on one or more scopes: "posts" for anything listing
+# posts, "post:<pk>" for a single post and its comments. Each scope has a state in
+# the cache - a random version and when the scope last changed - and blog.signals
+# replaces the state whenever something in the scope changes. A new state takes its
+# time from the newest post or comment timestamp in the scope, or, when the change
+# was a deletion, which leaves no row behind, from the deletion. A page's ETag is a
+# hash of its URL and the versions of its scopes, so a changed scope gives every
+# page depending on it a new ETag, and with it a new cache key; the old copies are
+# simply never read again and expire.
+#
+# A request with a matching If-None-Match/If-Modified-Since gets a 304, and a
+# repeated request gets the stored HTML; neither touches the database. Signed-in
+# users always get a freshly rendered page (with per-post fragments cached in the
+# templates).
+
+PAGE_TIMEOUT = 600
+
+
+def state_key(scope):
+    return f'blog_page:state:{scope}'
+
+
+def last_modified(scope):
+    """Unix time of the newest post or comment in `scope`."""
+    if scope == 'posts':
+        newest = [Post.objects.aggregate(newest=Max('updated_at'))['newest']]
+    else:
+        pk = scope.split(':', 1)[1]
+        newest = [
+            Post.objects.filter(pk=pk).aggregate(newest=Max('updated_at'))['newest'],
+            Comment.objects.filter(post_id=pk).aggregate(newest=Max('updated_at'))['newest'],
+        ]
+    newest = [timestamp for timestamp in newest if timestamp is not None]
+    return int(max(newest).timestamp()) if newest else 0
+
+
+def scope_states(scopes):
+    """{scope: (version, last modified timestamp)}, starting a new state where none is cached."""
+    keys = {state_key(scope): scope for scope in scopes}
+    states = {keys[key]: state for key, state in cache.get_many(keys).items()}
+    missing = {}
+    for scope in scopes:
+        if scope not in states:
+            states[scope] = missing[state_key(scope)] = (uuid.uuid4().hex, last_modified(scope))
+    if missing:
+        cache.set_many(missing, None)
+    return states
+
+
+def invalidate(*scopes, deleted=False):
+    if deleted:
+        # Nothing left in the database dates a deletion; it happened now
+        now = int(time.time())
+        cache.set_many({state_key(scope): (uuid.uuid4().hex, now) for scope in scopes}, None)
+    else:
+        cache.delete_many([state_key(scope) for scope in scopes])
+
+
+class CachedPageMixin(ABC):
+    page_timeout = PAGE_TIMEOUT
+
+    @abstractmethod
+    def get_cache_scopes(self):
+        """Scopes whose changes make this page stale."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return super().dispatch(request, *args, **kwargs)
+
+        states = scope_states(self.get_cache_scopes())
+        fingerprint = request.get_full_path() + ''.join(version for version, _ in sorted(states.values()))
+        etag = quote_etag(hashlib.md5(fingerprint.encode()).hexdigest())
+        last_modified = max(modified for _, modified in states.values())
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            page_key = f'blog_page:{etag}'
+            content = cache.get(page_key)
+            if content is None:
+                response = super().dispatch(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                response.render()
+                cache.set(page_key, response.content, self.page_timeout)
+            else:
+                response = HttpResponse(content)
+
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Signed-in users get a different page at the same URL
+        patch_vary_headers(response, ['Cookie'])
+        return response
@@ -8,10 +8,9 @@ class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ['title', 'content', 'tags']
-        widgets = ["TagWidget()", "tags"]
-        # widgets = {
-        #     'tags': TagWidget(attrs={'placeholder': 'Add tags separated by commas'}),
-        # }
+        widgets = {
+            'tags': TagWidget(attrs={'placeholder': 'Add tags separated by commas'}),
+        }
 
 class UserRegistrationform(UserCreationForm):
     email = forms.EmailField(required=True)
@@ -0,0 +1,24 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from blog.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Create the missing Profile rows for existing users, in batches of --batch-size."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        missing = User.objects.filter(profile__isnull=True).order_by('pk')
+        created = 0
+        while True:
+            user_ids = list(missing.values_list('pk', flat=True)[:options['batch_size']])
+            if not user_ids:
+                break
+            # ignore_conflicts skips users given a profile by Profile.for_user since the
+            # read above; count only the rows actually inserted
+            existing = Profile.objects.filter(user_id__in=user_ids).count()
+            Profile.objects.bulk_create([Profile(user_id=user_id) for user_id in user_ids], ignore_conflicts=True)
+            created += len(user_ids) - existing
+        self.stdout.write(self.style.SUCCESS(f"Created {created} profiles."))
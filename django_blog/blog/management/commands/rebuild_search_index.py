@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from blog.models import Post
+from blog.search import index_post
+
+
+class Command(BaseCommand):
+    help = "Index every blog post for search, in batches of --batch-size posts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        last_id = 0
+        indexed = 0
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last_id).order_by('id')
+                .prefetch_related('tags')[:options['batch_size']]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].id
+            for post in posts:
+                index_post(post)
+            indexed += len(posts)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} posts."))
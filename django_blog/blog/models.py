@@ -1,4 +1,5 @@
 from django.db import models
+from django.urls import reverse
 from django.contrib.auth.models import User
 from taggit.managers import TaggableManager
 
@@ -8,12 +9,18 @@ class Post(models.Model):
     title = models.CharField(max_length=200)
     content = models.TextField()
     published_date = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     tags = TaggableManager()
+    # Tokens indexed for this post by blog.search, for BM25 length normalization
+    search_length = models.PositiveIntegerField(default=0, editable=False)
 
     def __str__(self):
         return self.title
 
+    def get_absolute_url(self):
+        return reverse('post-detail', args=[self.pk])
+
 class Profile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     bio = models.TextField(blank=True)
@@ -21,6 +28,16 @@ class Profile(models.Model):
 
     def __str__(self):
         return f'{self.user.username} Profile'
+
+    @classmethod
+    def for_user(cls, user):
+        """The user's profile, created on first use (see also backfill_profiles)."""
+        try:
+            return user.profile
+        except cls.DoesNotExist:
+            profile, _ = cls.objects.get_or_create(user=user)
+            user.profile = profile
+            return profile
     
 class Comment(models.Model):
     post = models.ForeignKey("blog.Post", on_delete=models.CASCADE, related_name="comments")  # Use string reference
@@ -29,5 +46,28 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # A post's comment pages are range reads of this index, however long the thread
+        indexes = [models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx')]
+
+    def __str__(self):
+        return f"Comment by {self.author} on {self.post}"
+
+class SearchTerm(models.Model):
+    # A word of post text, or "tag:<slug>" for a tag facet
+    term = models.CharField(max_length=150, unique=True)
+    document_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.term
+
+class SearchPosting(models.Model):
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name="postings")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="search_postings")
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('term', 'post')
+
     def __str__(self):
-        return f"Comment by {self.author} on {self.post}"
\ No newline at end of file
+        return f"{self.term} in {self.post}"
@@ -0,0 +1,106 @@
+from collections import Counter, namedtuple
+
+from django.db.models import Count, FloatField, Sum
+from taggit.models import Tag
+from . import bm25
+from .models import Post, SearchPosting, SearchTerm
+
+# Search for blog posts over an inverted index kept in SearchTerm/SearchPosting.
+#
+# Title, content and tag names are split into lowercase words; every post also gets
+# one "tag:<slug>" posting per tag. A query reads only the posting lists of its
+# words: the hits are counted and their tag postings grouped into facets in SQL, and
+# the hits are ranked by BM25 (blog.bm25) and paged as ids, so no step touches
+# taggit's tables, scans the posts, counts the ranking or loads more than a page.
+# blog.signals re-indexes a post whenever it or its tags change.
+
+TAG_PREFIX = 'tag:'
+FACET_LIMIT = 20
+STATS_KEY = 'blog_search:stats'
+STATS_TIMEOUT = 300
+
+SearchResults = namedtuple('SearchResults', ['ids', 'count', 'facets'])
+
+
+def tokenize(text):
+    return bm25.tokenize(text, 100)
+
+
+def post_terms(post):
+    """{term: frequency} for everything indexed about `post`."""
+    tags = list(post.tags.all())
+    words = Counter(tokenize(' '.join([post.title, post.content] + [tag.name for tag in tags])))
+    facets = Counter(TAG_PREFIX + tag.slug for tag in tags)
+    return words, facets
+
+
+def index_post(post):
+    """Bring the postings of `post` up to date; returns the terms it gained or lost."""
+    words, facets = post_terms(post)
+    # Tag facets are postings too, but only words count towards the post's length
+    return bm25.update_postings(post, words + facets, sum(words.values()))
+
+
+def unindex_post(post):
+    """Take `post` out of the term counts; returns its terms."""
+    return bm25.remove_postings(post)
+
+
+def corpus_stats():
+    return bm25.corpus_stats(STATS_KEY, STATS_TIMEOUT)
+
+
+def search(query, tag_slug=None):
+    """
+    Ids of the posts matching any word of `query`, best first, narrowed to `tag_slug`
+    if given; how many there are; and [(tag, hit count)] facets over all hits of the query.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    matched = list(SearchTerm.objects.filter(term__in=terms, document_count__gt=0)) if terms else []
+    if not matched:
+        return SearchResults(Post.objects.none().values_list('pk', flat=True), 0, [])
+
+    # The hits, their number and the tag facets are all worked out by the database
+    # from the postings; only the page of ranked ids ever reaches Python
+    tag_term = TAG_PREFIX + tag_slug if tag_slug else None
+    hit_ids = SearchPosting.objects.filter(term__in=matched).values('post_id')
+    if tag_slug:
+        # One posting per (term, post), so its rows are the hits carrying the tag
+        count = SearchPosting.objects.filter(term__term=tag_term, post_id__in=hit_ids).count()
+    else:
+        count = hit_ids.distinct().count()
+    facet_hits = (
+        SearchPosting.objects.filter(term__term__startswith=TAG_PREFIX, post_id__in=hit_ids)
+        .values('term__term')
+        .annotate(hits=Count('post_id'))
+        .order_by('-hits', 'term__term')
+        .values_list('term__term', 'hits')[:FACET_LIMIT]
+    )
+
+    posts, average_length = corpus_stats()
+    score = bm25.score({term.id: term.document_count for term in matched}, posts, average_length)
+    ranked = Post.objects.filter(search_postings__term__in=matched)
+    if tag_slug:
+        ranked = ranked.filter(pk__in=SearchPosting.objects.filter(term__term=tag_term).values('post_id'))
+    ranked = (
+        ranked.annotate(rank=Sum(score, output_field=FloatField()))
+        .order_by('-rank', '-pk')
+        .values_list('pk', flat=True)
+    )
+    return SearchResults(ranked, count, tag_facets(facet_hits))
+
+
+def tag_facets(facet_hits):
+    """[(tag, hit count)] for the [("tag:<slug>", hit count)] rows of `facet_hits`."""
+    counts = list(facet_hits)
+    tags = Tag.objects.in_bulk([term[len(TAG_PREFIX):] for term, _ in counts], field_name='slug')
+    return [
+        (tags[term[len(TAG_PREFIX):]], hits)
+        for term, hits in counts if term[len(TAG_PREFIX):] in tags
+    ]
+
+
+def ranked_posts(ids):
+    """The posts of `ids` in that order, with what the results page shows of them."""
+    posts = Post.objects.select_related('author').prefetch_related('tags').in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
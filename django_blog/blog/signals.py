@@ -1,13 +1,30 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
-from django.contrib.auth.models import User
-from .models import Profile
+from .models import Post, Comment
+from .search import index_post, unindex_post
+from . import caching, tags
 
-@receiver(post_save, sender=User)
-def create_profile(sender, instance, created, **kwargs):
-    if created:
-        Profile.objects.create(user=instance)
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, raw, **kwargs):
+    if not raw:
+        tags.invalidate(index_post(instance))
 
-@receiver(post_save, sender=User)
-def save_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+@receiver(m2m_changed, sender=Post.tags.through)
+def index_retagged_post(sender, instance, action, **kwargs):
+    # taggit's TaggedItem is shared by every tagged model, so check what changed
+    if isinstance(instance, Post) and action in ('post_add', 'post_remove', 'post_clear'):
+        tags.invalidate(index_post(instance))
+
+@receiver(pre_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    tags.invalidate(unindex_post(instance))
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def expire_post_pages(sender, instance, signal, **kwargs):
+    caching.invalidate('posts', f'post:{instance.pk}', deleted=signal is post_delete)
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_commented_post_page(sender, instance, signal, **kwargs):
+    caching.invalidate(f'post:{instance.post_id}', deleted=signal is post_delete)
@@ -0,0 +1,100 @@
+import math
+
+from django.core.cache import cache
+from taggit.models import Tag
+from .models import Post, SearchPosting, SearchTerm
+from .search import TAG_PREFIX
+
+# Tag pages and the tag cloud, read from the "tag:<slug>" postings that blog.search
+# keeps for every tagged post. Postings are keyed by taggit's unique slug, so a tag
+# page is one range read of the (term, post) index; SearchTerm.document_count is
+# the tag's post count, kept up to date by every index change, so the cloud never
+# needs a GROUP BY over taggit's tables.
+#
+# On top of that, each tag's newest post ids and the cloud itself are cached, and
+# dropped by blog.signals whenever a post gains or loses the tag.
+
+TAG_POSTS_CACHE_SIZE = 1000
+TAG_CLOUD_SIZE = 50
+CACHE_TIMEOUT = 3600
+CLOUD_KEY = 'blog_tags:cloud'
+
+
+def tag_posts_key(slug):
+    return f'blog_tags:posts:{slug}'
+
+
+def tag_post_ids(slug):
+    """(post count, newest post ids) for the tag, the ids capped at TAG_POSTS_CACHE_SIZE."""
+    entry = cache.get(tag_posts_key(slug))
+    if entry is None:
+        term = SearchTerm.objects.filter(term=TAG_PREFIX + slug).first()
+        if term is None:
+            entry = (0, [])
+        else:
+            ids = list(
+                term.postings.order_by('-post_id').values_list('post_id', flat=True)[:TAG_POSTS_CACHE_SIZE]
+            )
+            entry = (term.document_count, ids)
+        cache.set(tag_posts_key(slug), entry, CACHE_TIMEOUT)
+    return entry
+
+
+class TaggedPosts:
+    """
+    A tag's posts, newest first, as a sequence for Paginator. Only the requested
+    slice of posts is loaded; pages past the cached ids read the postings directly.
+    """
+
+    def __init__(self, slug):
+        self.slug = slug
+        self.count, self.ids = tag_post_ids(slug)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        start, stop, _ = index.indices(self.count)
+        if stop <= len(self.ids):
+            ids = self.ids[start:stop]
+        else:
+            ids = list(
+                SearchPosting.objects.filter(term__term=TAG_PREFIX + self.slug)
+                .order_by('-post_id').values_list('post_id', flat=True)[start:stop]
+            )
+        posts = Post.objects.select_related('author').prefetch_related('tags').in_bulk(ids)
+        return [posts[post_id] for post_id in ids if post_id in posts]
+
+
+def cloud_size(count, largest):
+    # Log scale, so one huge tag does not flatten every other tag to the smallest size
+    if largest <= 1:
+        return 1
+    return 1 + round(4 * math.log(count) / math.log(largest))
+
+
+def tag_cloud():
+    """[(tag, post count, size 1-5)] for the most used tags, by name."""
+    cloud = cache.get(CLOUD_KEY)
+    if cloud is None:
+        counts = dict(
+            SearchTerm.objects.filter(term__startswith=TAG_PREFIX, document_count__gt=0)
+            .order_by('-document_count').values_list('term', 'document_count')[:TAG_CLOUD_SIZE]
+        )
+        tags = Tag.objects.filter(slug__in=[term[len(TAG_PREFIX):] for term in counts]).order_by('name')
+        largest = max(counts.values(), default=1)
+        cloud = [
+            (tag, counts[TAG_PREFIX + tag.slug], cloud_size(counts[TAG_PREFIX + tag.slug], largest))
+            for tag in tags
+        ]
+        cache.set(CLOUD_KEY, cloud, CACHE_TIMEOUT)
+    return cloud
+
+
+def invalidate(terms):
+    """Drop cached tag data for any "tag:<slug>" among the changed index `terms`."""
+    keys = [tag_posts_key(term[len(TAG_PREFIX):]) for term in terms if term.startswith(TAG_PREFIX)]
+    if keys:
+        cache.delete_many(keys + [CLOUD_KEY])
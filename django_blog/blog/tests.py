@@ -1,3 +1,216 @@
+from datetime import timedelta
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils.http import http_date
+from .models import Comment, Post, Profile, SearchPosting, SearchTerm
+from .search import search
+from .tags import tag_cloud
 
 # Create your tests here.
+class SearchTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+
+    def post(self, title, content, tags=()):
+        post = Post.objects.create(title=title, content=content, author=self.author)
+        post.tags.add(*tags)
+        return post
+
+    def test_index_follows_edits_tags_and_deletes(self):
+        post = self.post("Django tips", "django orm", tags=["Web"])
+        self.assertEqual(SearchPosting.objects.get(post=post, term__term="django").frequency, 2)
+        self.assertTrue(SearchPosting.objects.filter(post=post, term__term="tag:web").exists())
+
+        post.tags.set(["python"])
+        post.content = "orm"
+        post.save()
+        terms = set(SearchPosting.objects.filter(post=post).values_list("term__term", flat=True))
+        self.assertEqual(terms, {"django", "tips", "orm", "python", "tag:python"})
+
+        post.delete()
+        self.assertEqual(SearchTerm.objects.get(term="django").document_count, 0)
+        self.assertEqual(list(search("django").ids), [])
+
+    def test_ranking_and_tag_facets(self):
+        focused = self.post("Python", "python generators", tags=["python", "tutorial"])
+        passing = self.post("Weekend", "maybe some python later", tags=["life"])
+        tagged = self.post("Cooking", "nothing relevant", tags=["python"])
+
+        # Tag names are searchable text too
+        results = search("generators python")
+        self.assertEqual(list(results.ids), [focused.pk, tagged.pk, passing.pk])
+        self.assertEqual(results.count, 3)
+        facets = {tag.slug: hits for tag, hits in results.facets}
+        self.assertEqual(facets, {"python": 2, "tutorial": 1, "life": 1})
+
+        results = search("python", tag_slug="life")
+        self.assertEqual((list(results.ids), results.count), ([passing.pk], 1))
+
+    def test_search_view_paginates(self):
+        for i in range(12):
+            self.post(f"Post {i}", "searchable words", tags=["bulk"])
+        self.client.get(reverse("search_posts"), {"q": "searchable"})  # warms the corpus stats
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("search_posts"), {"q": "searchable", "page": 2})
+        self.assertEqual(response.status_code, 200)
+        # The hits are counted from their postings, never by counting the grouped ranking
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"] and "SUM(" in query["sql"]])
+        self.assertEqual(len(response.context["results"]), 2)
+        self.assertEqual(response.context["facets"][0][1], 12)
+
+
+class TagPagesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+
+    def post(self, title, tags):
+        post = Post.objects.create(title=title, content="Body", author=self.author)
+        post.tags.add(*tags)
+        return post
+
+    def test_tag_page_is_paginated_newest_first(self):
+        posts = [self.post(f"Post {i}", ["Django Tips"]) for i in range(12)]
+        self.post("Other", ["misc"])
+        url = reverse("PostByTagListView", kwargs={"tag_slug": "django-tips"})
+
+        response = self.client.get(url)
+        self.assertEqual(response.context["tag_name"], "Django Tips")
+        self.assertEqual(response.context["posts"], posts[::-1][:10])
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(response.context["posts"], posts[1::-1])
+
+        self.assertEqual(self.client.get(reverse("PostByTagListView", kwargs={"tag_slug": "nope"})).status_code, 404)
+
+    def test_tag_page_and_cloud_follow_tag_changes(self):
+        first = self.post("First", ["python", "web"])
+        self.post("Second", ["python"])
+        url = reverse("PostByTagListView", kwargs={"tag_slug": "web"})
+        self.assertEqual(len(self.client.get(url).context["posts"]), 1)
+        self.assertEqual([(tag.slug, count) for tag, count, _ in tag_cloud()], [("python", 2), ("web", 1)])
+
+        first.tags.remove("web")
+        self.assertEqual(len(self.client.get(url).context["posts"]), 0)
+        first.delete()
+        self.assertEqual([(tag.slug, count) for tag, count, _ in tag_cloud()], [("python", 1)])
+
+        with self.assertNumQueries(0):
+            tag_cloud()
+
+
+class PageCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(title="Cached", content="Body", author=self.author)
+        self.url = reverse("post-detail", kwargs={"pk": self.post.pk})
+
+    def test_anonymous_pages_are_served_from_cache(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, "Cached")
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(self.url), "Cached")
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(
+                self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]).status_code, 304
+            )
+
+    def test_changes_expire_only_affected_pages(self):
+        other = Post.objects.create(title="Other", content="Body", author=self.author)
+        other_url = reverse("post-detail", kwargs={"pk": other.pk})
+        etag = self.client.get(self.url)["ETag"]
+        other_etag = self.client.get(other_url)["ETag"]
+        list_etag = self.client.get(reverse("post-list"))["ETag"]
+
+        self.post.title = "Renamed"
+        self.post.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, "Renamed")
+        self.assertNotEqual(self.client.get(reverse("post-list"))["ETag"], list_etag)
+        self.assertEqual(self.client.get(other_url, HTTP_IF_NONE_MATCH=other_etag).status_code, 304)
+
+        etag = response["ETag"]
+        Comment.objects.create(post=self.post, author=self.author, content="Hi")
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_last_modified_is_the_newest_post_or_comment(self):
+        comment = Comment.objects.create(post=self.post, author=self.author, content="Hi")
+        Comment.objects.filter(pk=comment.pk).update(updated_at=self.post.updated_at + timedelta(days=1))
+        Post.objects.filter(pk=self.post.pk).update(updated_at=self.post.updated_at - timedelta(days=1))
+        response = self.client.get(self.url)
+        self.assertEqual(response["Last-Modified"], http_date(self.post.updated_at.timestamp() + 86400))
+        # Losing the cached state does not move it
+        cache.clear()
+        self.assertEqual(self.client.get(self.url)["Last-Modified"], response["Last-Modified"])
+
+    def test_signed_in_users_bypass_the_page_cache(self):
+        self.client.get(self.url)
+        self.client.force_login(self.author)
+        response = self.client.get(self.url)
+        self.assertContains(response, "Edit")
+        self.assertNotIn("ETag", response)
+
+
+class CommentPagesTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(title="Thread", content="Body", author=self.author)
+        self.client.force_login(self.author)  # signed in, so the page cache is bypassed
+
+    def add_comments(self, count):
+        start = self.post.comments.count()
+        for i in range(start, start + count):
+            commenter = User.objects.create_user(username=f"commenter{i}")
+            Comment.objects.create(post=self.post, author=commenter, content=f"Comment {i}")
+
+    def detail_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("post-detail", kwargs={"pk": self.post.pk}))
+        return response, len(queries)
+
+    def test_first_page_renders_in_constant_queries(self):
+        self.add_comments(3)
+        _, small = self.detail_queries()
+        self.add_comments(60)
+        response, large = self.detail_queries()
+        self.assertEqual(small, large)
+        self.assertEqual(len(response.context["comments_page"]), 20)
+        self.assertEqual(response.context["object"].comment_count, 63)
+
+    def test_json_pages(self):
+        self.add_comments(45)
+        url = reverse("post-comments", kwargs={"pk": self.post.pk})
+        data = self.client.get(url, {"page": 2}).json()
+        self.assertEqual([c["content"] for c in data["comments"]][0], "Comment 20")
+        self.assertEqual(data["next_page"], 3)
+        data = self.client.get(url, {"page": 3}).json()
+        self.assertEqual((len(data["comments"]), data["next_page"], data["count"]), (5, None, 45))
+
+
+class ProfileTestCase(TestCase):
+    def test_saving_users_writes_no_profiles(self):
+        user = User.objects.create_user(username="reader", password="password")
+        with self.assertNumQueries(1):
+            user.save(update_fields=["last_login"])
+        self.assertFalse(Profile.objects.exists())
+
+        profile = Profile.for_user(user)
+        self.assertEqual(profile.user, user)
+        with self.assertNumQueries(0):
+            self.assertEqual(Profile.for_user(user), profile)
+
+    def test_backfill_creates_missing_profiles(self):
+        users = [User.objects.create_user(username=f"user{i}") for i in range(3)]
+        Profile.for_user(users[0])
+        call_command("backfill_profiles", batch_size=1, stdout=StringIO())
+        self.assertEqual(Profile.objects.count(), 3)
@@ -26,6 +26,7 @@ urlpatterns = [
     path('post/<int:pk>/delete/', PostDeleteView.as_view(), name='post-delete'),
 
     # Comments
+    path('post/<int:pk>/comments/', views.post_comments, name='post-comments'),
     path('post/<int:pk>/comments/new/', CommentCreateView, name='CommentCreateView'),
     path('comment/<int:pk>/update/', CommentUpdateView.as_view(), name='edit_comment'),
     path('comment/<int:pk>/delete/', CommentDeleteView.as_view(), name='delete_comment'),
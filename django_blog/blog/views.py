@@ -1,4 +1,4 @@
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.decorators import login_required
@@ -7,11 +7,16 @@ from .forms import UserRegistrationform
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
-from .models import Post, Comment
+from .models import Post, Comment, Profile
 from django.views.generic.edit import UpdateView, DeleteView
 from django.utils.decorators import method_decorator
 from .forms import CommentForm
-from django.db.models import Q
+from django.core.paginator import Paginator
+from django.db.models import Count
+from .caching import CachedPageMixin
+from .search import ranked_posts, search
+from .tags import TaggedPosts, tag_cloud
+from taggit.models import Tag
 
 # Create your views here.
 def register(request):
@@ -28,19 +33,62 @@ def register(request):
     
 @login_required
 def profile(request):
-    return render(request, 'blog/profile.html')
+    return render(request, 'blog/profile.html', {'profile': Profile.for_user(request.user)})
 
 # Display all posts
-class PostListView(ListView):
+class PostListView(CachedPageMixin, ListView):
     model = Post
     template_name = 'blog/post_list.html'
     context_object_name = 'posts'
-    ordering = ['-date_created']
+    ordering = ['-published_date']
+
+    def get_cache_scopes(self):
+        return ['posts']
 
 # Display a single post
-class PostDetailView(DetailView):
+class PostDetailView(CachedPageMixin, DetailView):
     model = Post
     template_name = 'blog/post_detail.html'
+    queryset = Post.objects.select_related('author').annotate(comment_count=Count('comments'))
+
+    def get_cache_scopes(self):
+        return [f"post:{self.kwargs['pk']}"]
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Only the first page is rendered; later pages come from post_comments
+        context['comments_page'] = comments_page(self.object, 1)
+        return context
+
+COMMENTS_PER_PAGE = 20
+
+def comments_page(post, number):
+    """One page of a post's comments, oldest first, with their authors joined in."""
+    comments = post.comments.select_related('author').order_by('created_at', 'id')
+    paginator = Paginator(comments, COMMENTS_PER_PAGE)
+    if hasattr(post, 'comment_count'):
+        # Already counted alongside the post; spare the paginator its COUNT query
+        paginator.count = post.comment_count
+    return paginator.get_page(number)
+
+def post_comments(request, pk):
+    # JSON pages of comments for the "Load more comments" button on the post page
+    post = get_object_or_404(Post.objects.annotate(comment_count=Count('comments')), pk=pk)
+    page = comments_page(post, request.GET.get('page'))
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'content': comment.content,
+                'created_at': comment.created_at.isoformat(),
+            }
+            for comment in page
+        ],
+        'page': page.number,
+        'next_page': page.next_page_number() if page.has_next() else None,
+        'count': post.comment_count,
+    })
 
 # Create a new post
 class PostCreateView(LoginRequiredMixin, CreateView):
@@ -77,8 +125,8 @@ class PostDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
         return self.request.user == post.author
     
 @login_required
-def CommentCreateView(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+def CommentCreateView(request, pk):
+    post = get_object_or_404(Post, id=pk)
     if request.method == "POST":
         form = CommentForm(request.POST)
         if form.is_valid():
@@ -86,10 +134,10 @@ def CommentCreateView(request, post_id):
             comment.post = post
             comment.author = request.user
             comment.save()
-            return redirect('post_detail', pk=post_id)
+            return redirect('post-detail', pk=pk)
     else:
         form = CommentForm()
-    return render(request, 'blog/CommentCreateView.html', {'form': form, 'post': post})
+    return render(request, 'blog/add_comment.html', {'form': form, 'post': post})
 
 @method_decorator(login_required, name='dispatch')
 class CommentUpdateView(UpdateView):
@@ -118,14 +166,33 @@ class CommentDeleteView(DeleteView):
     
 def search_posts(request):
     query = request.GET.get('q', '')
-    results = []
-    if query:
-        results = Post.objects.filter(
-            Q(title__icontains=query) | Q(content__icontains=query) | Q(tags__name__icontains=query)
-        ).distinct
+    tag = request.GET.get('tag', '')
+    results = search(query, tag_slug=tag)
+    paginator = Paginator(results.ids, 10)
+    # Known from the search itself, which saves a COUNT over the grouped ranking
+    paginator.count = results.count
+    page = paginator.get_page(request.GET.get('page'))
+
+    return render(request, 'blog/search_results.html', {
+        'query': query,
+        'tag': tag,
+        'results': ranked_posts(list(page.object_list)),
+        'page_obj': page,
+        'facets': results.facets,
+    })
 
-    return render(request, 'blog/search_results.html', {'query': query, 'results': results})
+class PostByTagListView(ListView):
+    template_name = 'blog/postByTagListView.html'
+    context_object_name = 'posts'
+    paginate_by = 10
+
+    def get_queryset(self):
+        self.tag = get_object_or_404(Tag, slug=self.kwargs['tag_slug'])
+        return TaggedPosts(self.tag.slug)
 
-def PostByTagListView(request, tag_name):
-    posts = Post.objects.filter(tags__name__iexact=tag_name)
-    return render(request, 'blog/postByTagListView.html', {'tag_name': tag_name, 'posts': posts})
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tag'] = self.tag
+        context['tag_name'] = self.tag.name
+        context['tag_cloud'] = tag_cloud()
+        return context
@@ -1,6 +1,19 @@
+import atexit
+import os
+
 from django.apps import AppConfig
 
 
 class AccountsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'accounts'
+
+    def ready(self):
+        import accounts.checks
+        import accounts.signals
+        from . import hashing
+
+        # The password hashing pool is started lazily; see accounts.hashing
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=hashing.forget_pool)
+        atexit.register(hashing.shutdown_pool)
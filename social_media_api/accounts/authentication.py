@@ -0,0 +1,105 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+
+class TokenCache:
+    """
+    Two-tier cache of Token rows (with their user joined in), keyed by token key.
+
+    The first tier is a bounded LRU with a TTL in this process. The optional second
+    tier is a Django cache alias named by TOKEN_AUTH_SHARED_CACHE, shared by every
+    process (see the accounts.E002 check). Deleting a token (which is also how tokens are rotated) or saving its
+    user evicts it from both tiers - see accounts.signals. Other processes' LRUs
+    only catch up when their entry expires, so the TTL is the upper bound on how
+    long a revoked token can keep working there.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_size(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_SIZE', 10000)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'TOKEN_AUTH_CACHE_TTL', 60)
+
+    def shared(self):
+        alias = getattr(settings, 'TOKEN_AUTH_SHARED_CACHE', None)
+        return caches[alias] if alias else None
+
+    def shared_key(self, key):
+        return f'token_auth:{key}'
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    return token
+                del self._entries[key]
+
+        shared = self.shared()
+        token = shared.get(self.shared_key(key)) if shared is not None else None
+        if token is not None:
+            self._remember(key, token)
+        return token
+
+    def set(self, key, token):
+        self._remember(key, token)
+        shared = self.shared()
+        if shared is not None:
+            shared.set(self.shared_key(key), token, self.ttl)
+
+    def evict(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        shared = self.shared()
+        if shared is not None:
+            shared.delete(self.shared_key(key))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _remember(self, key, token):
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that skips the Token/user query when the token is cached.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            try:
+                token = Token.objects.select_related('user').get(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            token_cache.set(key, token)
+        # The cached user is shared between requests; hand each request its own copy
+        return (copy.copy(token.user), token)
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from .hashing import hash_password, verify_password
+
+UserModel = get_user_model()
+
+
+class PooledModelBackend(ModelBackend):
+    """
+    ModelBackend that checks the password in accounts.hashing's process pool
+    instead of on the request thread, and saves the upgraded hash it returns for
+    a legacy algorithm or too few iterations.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_natural_key(username)
+        except UserModel.DoesNotExist:
+            # Hash anyway so an unknown username takes as long as a wrong password
+            hash_password(password)
+            return None
+        valid, new_hash = verify_password(password, user.password)
+        if not valid:
+            return None
+        if new_hash is not None:
+            user.password = new_hash
+            user.save(update_fields=['password'])
+        if self.user_can_authenticate(user):
+            return user
+        return None
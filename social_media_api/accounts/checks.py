@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.core.checks import register
+from social_media_api.checks import shared_cache_errors
+
+
+@register()
+def follow_graph_cache_check(app_configs, **kwargs):
+    # The follow graph is invalidated only in the process that changes it, so a
+    # per-process cache would keep serving stale following/follower sets elsewhere
+    return shared_cache_errors('FOLLOW_GRAPH_CACHE', 'accounts.E001')
+
+
+@register()
+def token_auth_cache_check(app_configs, **kwargs):
+    # The optional second tier of accounts.authentication.token_cache exists to spare
+    # other processes the Token query, which neither a per-process nor a database cache does
+    if getattr(settings, 'TOKEN_AUTH_SHARED_CACHE', None) is None:
+        return []
+    return shared_cache_errors('TOKEN_AUTH_SHARED_CACHE', 'accounts.E002')
@@ -0,0 +1,55 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+
+# Follow-graph adjacency cache.
+# Each user's following and follower ids are cached as a frozenset, so membership
+# checks (is_following, is_followed_by, the feed's author set) are O(1) and need no
+# query once warm. The storage is the Django cache named by FOLLOW_GRAPH_CACHE (an
+# alias in CACHES). Entries are invalidated from accounts.signals whenever
+# CustomUser.followers changes, in the process making the change, so the backend must
+# be shared by every process serving requests; accounts.checks rejects process-local
+# ones.
+
+def graph_cache():
+    return caches[getattr(settings, 'FOLLOW_GRAPH_CACHE', 'default')]
+
+def timeout():
+    return getattr(settings, 'FOLLOW_GRAPH_CACHE_TIMEOUT', 3600)
+
+def following_key(user_id):
+    return f'follow_graph:following:{user_id}'
+
+def followers_key(user_id):
+    return f'follow_graph:followers:{user_id}'
+
+def follow_edges():
+    # Rows of the followers through table: from_customuser is followed by to_customuser
+    return apps.get_model(settings.AUTH_USER_MODEL).followers.through.objects
+
+def following_ids(user_id):
+    """Ids of the users `user_id` follows."""
+    ids = graph_cache().get(following_key(user_id))
+    if ids is None:
+        ids = frozenset(
+            follow_edges().filter(to_customuser_id=user_id).values_list('from_customuser_id', flat=True)
+        )
+        graph_cache().set(following_key(user_id), ids, timeout())
+    return ids
+
+def follower_ids(user_id):
+    """Ids of the users following `user_id`."""
+    ids = graph_cache().get(followers_key(user_id))
+    if ids is None:
+        ids = frozenset(
+            follow_edges().filter(from_customuser_id=user_id).values_list('to_customuser_id', flat=True)
+        )
+        graph_cache().set(followers_key(user_id), ids, timeout())
+    return ids
+
+def invalidate(following=(), followers=()):
+    """Drop the cached following sets of `following` and follower sets of `followers`."""
+    keys = [following_key(user_id) for user_id in following]
+    keys += [followers_key(user_id) for user_id in followers]
+    if keys:
+        graph_cache().delete_many(keys)
@@ -0,0 +1,79 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, get_hasher, identify_hasher, make_password
+
+# Password hashing off the request threads.
+# PBKDF2 is deliberately CPU-bound, so register/login hand just the hashing call to a
+# bounded process pool (PASSWORD_HASHING_WORKERS processes, default one per core)
+# and wait for the result. However many requests arrive at once, only that many
+# hashes run in parallel, and they do so outside the web workers' GIL.
+# PASSWORD_HASHING_WORKERS = 0 hashes in the calling thread instead (used by the tests).
+#
+# The pool is started on first use. AccountsConfig.ready() arranges for it to be
+# dropped in forked children (a pool does not survive a fork) and shut down at exit.
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _setup_worker():
+    # Workers started with the 'spawn' method need Django configured before hashing
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+
+
+def hashing_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = getattr(settings, 'PASSWORD_HASHING_WORKERS', None) or os.cpu_count()
+            _pool = ProcessPoolExecutor(max_workers=workers, initializer=_setup_worker)
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def forget_pool():
+    # In a forked child the parent's pool is unusable: start afresh on first use
+    global _pool, _pool_lock
+    _pool, _pool_lock = None, threading.Lock()
+
+
+def verify(password, encoded):
+    """
+    Check `password` against `encoded`. Returns (valid, new_encoded), where
+    new_encoded is a fresh hash when `encoded` uses a legacy algorithm or fewer
+    iterations than the preferred hasher, and None otherwise.
+    """
+    if not check_password(password, encoded):
+        return False, None
+    preferred = get_hasher('default')
+    hasher = identify_hasher(encoded)
+    if hasher.algorithm != preferred.algorithm or preferred.must_update(encoded):
+        return True, make_password(password)
+    return True, None
+
+
+def _run(func, *args):
+    if getattr(settings, 'PASSWORD_HASHING_WORKERS', None) == 0:
+        return func(*args)
+    return hashing_pool().submit(func, *args).result()
+
+
+def hash_password(password):
+    return _run(make_password, password)
+
+
+def verify_password(password, encoded):
+    return _run(verify, password, encoded)
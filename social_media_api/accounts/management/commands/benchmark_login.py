@@ -0,0 +1,50 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import check_password, make_password
+from django.core.management.base import BaseCommand
+from accounts.hashing import hashing_pool, verify
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the password check behind LoginView: check_password on the request "
+        "threads (before) against request threads handing it to accounts.hashing's "
+        "process pool (after). "
+        "Reports logins/sec overall and per core."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--threads', type=int, default=os.cpu_count(),
+                            help="Request threads for both runs.")
+
+    def handle(self, *args, **options):
+        logins = options['logins']
+        encoded = make_password('benchmark-password')
+        cores = os.cpu_count()
+
+        def sync_login(_):
+            return check_password('benchmark-password', encoded)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as threads:
+            list(threads.map(sync_login, range(logins)))
+        before = logins / (time.perf_counter() - start)
+
+        pool = hashing_pool()
+
+        def pooled_login(_):
+            return pool.submit(verify, 'benchmark-password', encoded).result()
+
+        # Start the workers outside the timed section
+        pool.submit(make_password, 'warm-up').result()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['threads']) as threads:
+            list(threads.map(pooled_login, range(logins)))
+        after = logins / (time.perf_counter() - start)
+
+        self.stdout.write(f"cores: {cores}, logins per run: {logins}")
+        self.stdout.write(f"before (sync, {options['threads']} threads): {before:.1f} logins/sec, {before / cores:.1f} per core")
+        self.stdout.write(f"after (process pool): {after:.1f} logins/sec, {after / cores:.1f} per core")
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-18 01:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='fanout_on_read',
+            field=models.BooleanField(default=False),
+        ),
+    ]
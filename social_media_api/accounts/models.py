@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from . import follow_graph
 
 # Create your models here.
 class CustomUser(AbstractUser):
@@ -7,6 +8,9 @@ class CustomUser(AbstractUser):
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     followers = models.ManyToManyField('self', symmetrical=False, related_name='following')
     # following = models.ManyToManyField('self', symmetrical=False, related_name='followers', blank=True)
+    # Set once the user has too many followers for fan-out-on-write; their
+    # posts are then merged into followers' feeds at read time (see posts.timeline)
+    fanout_on_read = models.BooleanField(default=False)
 
     def follow(self, user):
         self.following.add(user)
@@ -14,8 +18,9 @@ class CustomUser(AbstractUser):
     def unfollow(self, user):
         self.following.remove(user)
 
+    # Both checks are served from the follow-graph cache (see accounts.follow_graph)
     def is_following(self, user):
-        return self.following.filter(id=user.id).exists()
+        return user.id in follow_graph.following_ids(self.id)
     
     def is_followed_by(self, user):
-        return self.followers.filter(id=user.id).exists()
+        return user.id in follow_graph.follower_ids(self.id)
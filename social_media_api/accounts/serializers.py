@@ -1,3 +1,6 @@
+import csv
+import json
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework.authtoken.models import Token
 from .models import CustomUser
@@ -22,29 +25,82 @@ class RegisterSerializer(serializers.ModelSerializer):
         }
 
     def create(self, validated_data):
-        # Create the user
-        user = get_user_model().objects.create_user(
-            username=validated_data['username'],
-            password=validated_data['password'],
-            email=validated_data.get('email', ''),
+        # Create the user. RegisterView hashes the password in the hashing
+        # pool and passes the result in as password_hash.
+        User = get_user_model()
+        password_hash = validated_data.pop('password_hash', None)
+        user = User(
+            username=User.normalize_username(validated_data['username']),
+            email=User.objects.normalize_email(validated_data.get('email', '')),
             bio=validated_data.get('bio', ''),
             profile_picture=validated_data.get('profile_picture', None)
         )
+        if password_hash is not None:
+            user.password = password_hash
+        else:
+            user.set_password(validated_data['password'])
+        user.save()
         # Create a token for the user
         Token.objects.create(user=user)
         return user
     
 class LoginSerializer(serializers.Serializer):
+    # authenticate() checks the password off the request thread through
+    # accounts.backends.PooledModelBackend
     username = serializers.CharField()
     password = serializers.CharField(write_only = True)
 
     def validate(self, data):
-        user = authenticate(**data)
-        if user:
-            return user
-        return serializers.ValidationError("Invalid credentials")
+        user = authenticate(self.context.get('request'), **data)
+        if user is None:
+            raise serializers.ValidationError("Invalid credentials")
+        return {'user': user}
     
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
-        fields = ('id', 'username', 'email', 'first_name', 'last_name')  
\ No newline at end of file
+        fields = ('id', 'username', 'email', 'first_name', 'last_name')
+
+    def __init__(self, *args, **kwargs):
+        # Optional `fields` argument restricts the output to a sparse fieldset
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)  
+
+class BulkFollowSerializer(serializers.Serializer):
+    # Either a JSON list of ids or an uploaded CSV (one id per row, optional
+    # "user_id" header) / NDJSON ({"user_id": 1} per line) file
+    action = serializers.ChoiceField(choices=['follow', 'unfollow'])
+    user_ids = serializers.ListField(child=serializers.CharField(), required=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, data):
+        if 'file' in data:
+            entries = self.parse_file(data['file'])
+        elif 'user_ids' in data:
+            entries = data['user_ids']
+        else:
+            raise serializers.ValidationError("Provide user_ids or a file.")
+
+        max_ids = getattr(settings, 'FOLLOW_BULK_MAX_IDS', 1000)
+        if len(entries) > max_ids:
+            raise serializers.ValidationError(f"At most {max_ids} user ids per request.")
+        data['entries'] = entries
+        return data
+
+    def parse_file(self, upload):
+        lines = [line.strip() for line in upload.read().decode('utf-8-sig').splitlines() if line.strip()]
+        if upload.name.endswith(('.ndjson', '.jsonl')):
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(str(json.loads(line)['user_id']))
+                except (ValueError, KeyError, TypeError):
+                    entries.append(line)
+            return entries
+        rows = [row[0].strip() for row in csv.reader(lines) if row]
+        if rows and rows[0] == 'user_id':
+            rows = rows[1:]
+        return rows
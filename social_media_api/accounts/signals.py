@@ -0,0 +1,51 @@
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .models import CustomUser
+from .authentication import token_cache
+from . import follow_graph
+
+@receiver(m2m_changed, sender=CustomUser.followers.through)
+def invalidate_follow_graph(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # pk_set is not given for clear(); remember who is about to be affected
+        related = instance.following if reverse else instance.followers
+        instance._follow_graph_cleared_ids = set(related.values_list('id', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_follow_graph_cleared_ids', set())
+    elif action not in ('post_add', 'post_remove'):
+        return
+
+    if reverse:
+        # instance.following changed: instance follows / stops following pk_set
+        follow_graph.invalidate(following=[instance.id], followers=pk_set)
+    else:
+        # instance.followers changed: pk_set follow / stop following instance
+        follow_graph.invalidate(following=pk_set, followers=[instance.id])
+
+
+@receiver(post_delete, sender=Token)
+def evict_deleted_token(sender, instance, **kwargs):
+    token_cache.evict(instance.key)
+
+@receiver(post_init, sender=CustomUser)
+def remember_token_auth_state(sender, instance, **kwargs):
+    instance._token_auth_state = token_auth_state(instance)
+
+@receiver(post_save, sender=CustomUser)
+def evict_tokens_of_saved_user(sender, instance, created, **kwargs):
+    # The cached token carries a copy of the user row; drop it when the user loses
+    # access through it, i.e. on a password or is_active change. Other saves
+    # (last_login, profile fields, ...) neither query the tokens nor evict them.
+    state = token_auth_state(instance)
+    changed = state != getattr(instance, '_token_auth_state', None)
+    instance._token_auth_state = state
+    if created or not changed:
+        return
+    for key in Token.objects.filter(user_id=instance.pk).values_list('key', flat=True):
+        token_cache.evict(key)
+
+def token_auth_state(user):
+    # Read from __dict__ so deferred fields are not loaded just for this
+    return (user.__dict__.get('password'), user.__dict__.get('is_active'))
@@ -1,3 +1,227 @@
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.signals import user_login_failed
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from social_media_api.testing import without_ssl_redirect
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
+from .authentication import CachedTokenAuthentication, token_cache
+from .checks import follow_graph_cache_check, token_auth_cache_check
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
 
 # Create your tests here.
+class FollowGraphCacheTestCase(TestCase):
+    def setUp(self):
+        caches['follow_graph'].clear()
+        self.alice = User.objects.create_user(username="alice", password="password")
+        self.bob = User.objects.create_user(username="bob", password="password")
+
+    def test_membership_is_served_from_cache(self):
+        self.alice.follow(self.bob)
+        self.assertTrue(self.alice.is_following(self.bob))
+        self.assertTrue(self.bob.is_followed_by(self.alice))
+        self.assertFalse(self.bob.is_following(self.alice))
+        with self.assertNumQueries(0):
+            self.assertTrue(self.alice.is_following(self.bob))
+            self.assertFalse(self.bob.is_following(self.alice))
+            self.assertTrue(self.bob.is_followed_by(self.alice))
+
+    def test_follow_changes_invalidate_both_sides(self):
+        self.assertFalse(self.alice.is_following(self.bob))
+        self.assertFalse(self.bob.is_followed_by(self.alice))
+
+        self.bob.followers.add(self.alice)
+        self.assertTrue(self.alice.is_following(self.bob))
+        self.assertTrue(self.bob.is_followed_by(self.alice))
+
+        self.alice.following.clear()
+        self.assertFalse(self.alice.is_following(self.bob))
+        self.assertFalse(self.bob.is_followed_by(self.alice))
+
+    def test_configured_cache_is_shared_and_query_free(self):
+        self.assertEqual(follow_graph_cache_check(None), [])
+        for backend in ("locmem.LocMemCache", "db.DatabaseCache"):
+            cache = {"BACKEND": f"django.core.cache.backends.{backend}", "LOCATION": "follow_graph_check"}
+            with self.subTest(backend=backend), override_settings(CACHES={**settings.CACHES, "follow_graph": cache}):
+                self.assertEqual([error.id for error in follow_graph_cache_check(None)], ["accounts.E001"])
+
+
+@without_ssl_redirect
+class BulkFollowTestCase(APITestCase):
+    def setUp(self):
+        caches['follow_graph'].clear()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.others = [User.objects.create_user(username=f"other{i}", password="password") for i in range(3)]
+        self.client.force_authenticate(self.user)
+
+    def results(self, response):
+        return {item["user_id"]: item["result"] for item in response.data["results"]}
+
+    def test_bulk_follow_reports_per_id_results(self):
+        self.user.follow(self.others[0])
+        ids = [other.id for other in self.others] + [self.user.id, 999999, "abc"]
+        response = self.client.post(reverse("bulk_follow"), {"action": "follow", "user_ids": ids}, format="json")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.results(response), {
+            str(self.others[0].id): "already_following",
+            str(self.others[1].id): "followed",
+            str(self.others[2].id): "followed",
+            str(self.user.id): "self",
+            "999999": "not_found",
+            "abc": "invalid",
+        })
+        self.assertTrue(all(self.user.is_following(other) for other in self.others))
+        self.assertTrue(self.others[1].is_followed_by(self.user))
+
+    def test_bulk_unfollow(self):
+        self.user.follow(self.others[0])
+        ids = [self.others[0].id, self.others[1].id]
+        response = self.client.post(reverse("bulk_follow"), {"action": "unfollow", "user_ids": ids}, format="json")
+        self.assertEqual(set(self.results(response).values()), {"unfollowed", "not_following"})
+        self.assertFalse(self.user.is_following(self.others[0]))
+
+    def test_results_come_from_the_database_not_the_cache(self):
+        # Warm the cache, then change the rows behind its back (as another process would)
+        self.assertFalse(self.user.is_following(self.others[0]))
+        User.followers.through.objects.create(from_customuser=self.others[0], to_customuser=self.user)
+
+        response = self.client.post(reverse("bulk_follow"), {"action": "follow", "user_ids": [self.others[0].id]}, format="json")
+        self.assertEqual(self.results(response), {str(self.others[0].id): "already_following"})
+        response = self.client.post(reverse("bulk_follow"), {"action": "unfollow", "user_ids": [self.others[0].id]}, format="json")
+        self.assertEqual(self.results(response), {str(self.others[0].id): "unfollowed"})
+        self.assertFalse(self.user.following.filter(id=self.others[0].id).exists())
+
+    def test_csv_and_ndjson_imports(self):
+        csv_file = SimpleUploadedFile("follows.csv", f"user_id\n{self.others[0].id}\n".encode())
+        self.client.post(reverse("bulk_follow"), {"action": "follow", "file": csv_file})
+        ndjson = SimpleUploadedFile("follows.ndjson", f'{{"user_id": {self.others[1].id}}}\n'.encode())
+        self.client.post(reverse("bulk_follow"), {"action": "follow", "file": ndjson})
+        self.assertEqual(set(self.user.following.all()), {self.others[0], self.others[1]})
+
+
+@without_ssl_redirect
+class UserDirectoryTestCase(APITestCase):
+    def setUp(self):
+        for name in ["carol", "alice", "alfred", "bob"]:
+            User.objects.create_user(username=name, email=f"{name}@example.com", password="password")
+        self.client.force_authenticate(User.objects.get(username="bob"))
+
+    def test_directory_is_paginated_by_username(self):
+        response = self.client.get(reverse("user_list"), {"page_size": 3})
+        self.assertEqual([u["username"] for u in response.data["results"]], ["alfred", "alice", "bob"])
+        response = self.client.get(response.data["next"])
+        self.assertEqual([u["username"] for u in response.data["results"]], ["carol"])
+
+    def test_prefix_search_and_sparse_fields(self):
+        response = self.client.get(reverse("user_list"), {"search": "al", "fields": "id,username"})
+        self.assertEqual(response.data["results"][0].keys(), {"id", "username"})
+        self.assertEqual([u["username"] for u in response.data["results"]], ["alfred", "alice"])
+        response = self.client.get(reverse("user_list"), {"search": "AL"})
+        self.assertEqual([u["username"] for u in response.data["results"]], ["alfred", "alice"])
+
+
+class CachedTokenAuthenticationTestCase(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.token = Token.objects.create(user=self.user)
+        self.auth = CachedTokenAuthentication()
+
+    def test_warm_cache_skips_the_database(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual((user, token), (self.user, self.token))
+
+    def test_deleted_token_is_evicted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_deactivated_user_is_evicted(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_unrelated_save_keeps_the_token(self):
+        self.auth.authenticate_credentials(self.token.key)
+        user = User.objects.get(pk=self.user.pk)
+        user.bio = "Hello"
+        with self.assertNumQueries(1):  # the UPDATE, without looking up tokens
+            user.save()
+        with self.assertNumQueries(0):
+            self.auth.authenticate_credentials(self.token.key)
+
+        user.set_password("changed")
+        user.save()
+        with self.assertNumQueries(1):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_shared_token_cache_must_be_shared(self):
+        self.assertEqual(token_auth_cache_check(None), [])
+        with override_settings(TOKEN_AUTH_SHARED_CACHE="follow_graph"):
+            self.assertEqual(token_auth_cache_check(None), [])
+        with override_settings(TOKEN_AUTH_SHARED_CACHE="default"):
+            self.assertEqual([error.id for error in token_auth_cache_check(None)], ["accounts.E002"])
+
+
+@without_ssl_redirect
+@override_settings(PASSWORD_HASHING_WORKERS=0)
+class RegisterLoginTestCase(TestCase):
+    def test_register_then_login(self):
+        response = self.client.post(
+            reverse("register"), {"username": "new", "password": "s3cret-pass", "email": "new@example.com"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        token = response.json()["token"]
+
+        response = self.client.post(
+            reverse("login"), {"username": "new", "password": "s3cret-pass"}, content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["token"], token)
+
+    def test_wrong_password_and_unknown_user(self):
+        User.objects.create_user(username="user", password="password")
+        for username, password in [("user", "wrong"), ("nobody", "password")]:
+            response = self.client.post(reverse("login"), {"username": username, "password": password})
+            self.assertEqual(response.status_code, 400)
+
+    def test_login_goes_through_authenticate(self):
+        User.objects.create_user(username="inactive", password="password", is_active=False)
+        failures = []
+        receiver = lambda sender, credentials, **kwargs: failures.append(credentials["username"])
+        user_login_failed.connect(receiver)
+        self.addCleanup(user_login_failed.disconnect, receiver)
+        for username in ["inactive", "nobody"]:
+            response = self.client.post(reverse("login"), {"username": username, "password": "password"})
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(failures, ["inactive", "nobody"])
+
+    @override_settings(PASSWORD_HASHERS=[
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.MD5PasswordHasher",
+    ])
+    def test_legacy_hash_is_upgraded_on_login(self):
+        user = User.objects.create(username="legacy", password=make_password("password", hasher="md5"))
+        response = self.client.post(reverse("login"), {"username": "legacy", "password": "password"})
+        self.assertEqual(response.status_code, 200)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith("pbkdf2_sha256$"))
+
+    @override_settings(PASSWORD_HASHING_WORKERS=1)
+    def test_login_through_process_pool(self):
+        User.objects.create_user(username="user", password="password")
+        response = self.client.post(reverse("login"), {"username": "user", "password": "password"})
+        self.assertEqual(response.status_code, 200)
@@ -1,9 +1,11 @@
 from django.urls import path
-from .views import RegisterView, LoginView, FollowUserView, UnfollowUserView
+from .views import RegisterView, LoginView, FollowUserView, UnfollowUserView, BulkFollowView, UserListView
 
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('follow/<int:user_id>/', FollowUserView.as_view(), name='follow_user'),
     path('unfollow/<int:user_id>/', UnfollowUserView.as_view(), name='unfollow_user'),
+    path('follow/bulk/', BulkFollowView.as_view(), name='bulk_follow'),
+    path('users/', UserListView.as_view(), name='user_list'),
 ]
@@ -3,28 +3,33 @@ from django.shortcuts import render
 from rest_framework.response import Response
 from rest_framework import status, permissions, generics
 from rest_framework.authtoken.models import Token
-from .serializers import RegisterSerializer, LoginSerializer, UserSerializer
+from .serializers import RegisterSerializer, LoginSerializer, UserSerializer, BulkFollowSerializer
+from .hashing import hash_password
+from social_media_api.pagination import KeysetPagination
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
+from django.db import router, transaction
+from django.db.models.signals import m2m_changed
 
 CustomUser = get_user_model()
 
 # Create your views here.
+# Register hashes the password, and login checks it through authenticate() and
+# accounts.backends.PooledModelBackend, in accounts.hashing's process pool, so
+# PBKDF2 runs there rather than on the request thread.
 class RegisterView(generics.GenericAPIView):
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.save()
-            token, _ = Token.objects.get_or_create(user=user)
-            return Response({"token": token.key}, status=status.HTTP_201_CREATED)
+            user = serializer.save(password_hash=hash_password(serializer.validated_data['password']))
+            return Response({"token": user.auth_token.key}, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
 class LoginView(generics.GenericAPIView):
     def post(self, request):
-        serializer = LoginSerializer(data=request.data)
+        serializer = LoginSerializer(data=request.data, context={'request': request})
         if serializer.is_valid():
-            user = serializer.validated_data
-            token, _ = Token.objects.get_or_create(user=user)
+            token, _ = Token.objects.get_or_create(user=serializer.validated_data['user'])
             return Response({"token": token.key}, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
@@ -58,11 +63,107 @@ class UnfollowUserView(generics.GenericAPIView):
         except ObjectDoesNotExist:
             return Response({"detail": "CustomUser not found"}, status=status.HTTP_404_NOT_FOUND)
         
-class UserListView(generics.GenericAPIView):
+class BulkFollowView(generics.GenericAPIView):
+    """
+    Follow or unfollow many users at once: ids are validated with one query and the
+    changes written with one bulk INSERT (or DELETE) on the followers through table.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkFollowSerializer
+
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        action = serializer.validated_data['action']
+        entries = serializer.validated_data['entries']
+
+        parsed = {}
+        for entry in entries:
+            try:
+                parsed[entry] = int(entry)
+            except ValueError:
+                parsed[entry] = None
+        requested = {user_id for user_id in parsed.values() if user_id is not None}
+        existing = set(CustomUser.objects.filter(id__in=requested).values_list('id', flat=True))
+        targets = existing - {request.user.id}
+        changed = self.apply(request.user, action, targets) if targets else set()
+
+        outcome = {}
+        for user_id in requested:
+            if user_id not in existing:
+                outcome[user_id] = "not_found"
+            elif user_id == request.user.id:
+                outcome[user_id] = "self"
+            elif action == 'follow':
+                outcome[user_id] = "followed" if user_id in changed else "already_following"
+            else:
+                outcome[user_id] = "unfollowed" if user_id in changed else "not_following"
+
+        results = [
+            {"user_id": entry, "result": outcome[user_id] if user_id is not None else "invalid"}
+            for entry, user_id in parsed.items()
+        ]
+        return Response({"results": results}, status=status.HTTP_200_OK)
+
+    def apply(self, user, action, user_ids):
+        """Follow or unfollow `user_ids`; returns the ids whose follow row was actually written."""
+        Follow = CustomUser.followers.through
+        db = router.db_for_write(Follow, instance=user)
+        with transaction.atomic(using=db):
+            # The current rows are read from the database, never from the follow-graph cache
+            edges = Follow.objects.using(db).filter(to_customuser_id=user.id, from_customuser_id__in=user_ids)
+            if action == 'follow':
+                changed = user_ids - set(edges.values_list('from_customuser_id', flat=True))
+                Follow.objects.using(db).bulk_create(
+                    [Follow(from_customuser_id=user_id, to_customuser_id=user.id) for user_id in changed],
+                    ignore_conflicts=True,
+                )
+            else:
+                # Locked, so the rows reported as unfollowed are exactly the ones deleted here
+                changed = set(edges.select_for_update().values_list('from_customuser_id', flat=True))
+                if changed:
+                    edges.filter(from_customuser_id__in=changed).delete()
+            if changed:
+                # Same signal user.following.add()/remove() sends, so the follow-graph
+                # cache and the home timeline are kept in step
+                m2m_changed.send(
+                    sender=Follow, instance=user, reverse=True, model=CustomUser, pk_set=changed, using=db,
+                    action='post_add' if action == 'follow' else 'post_remove',
+                )
+        return changed
+
+class UserDirectoryPagination(KeysetPagination):
+    # username is unique, so it is a complete keyset on its own and its index
+    # serves both the ordering and the prefix search
+    ordering = ('username',)
+    page_size = 50
+
+class UserListView(generics.ListAPIView):
+    """
+    Paginated user directory. `?search=` matches a username prefix and
+    `?fields=id,username` returns (and loads) only the listed fields.
+    """
     permission_classes = [permissions.IsAuthenticated]  # To ensure the user is logged in
+    serializer_class = UserSerializer
+    pagination_class = UserDirectoryPagination
+
+    def requested_fields(self):
+        fields = UserSerializer.Meta.fields
+        requested = self.request.query_params.get('fields')
+        if requested:
+            wanted = {name.strip() for name in requested.split(',')}
+            fields = tuple(name for name in fields if name in wanted) or fields
+        return fields
+
+    def get_queryset(self):
+        # Only the columns the response needs (plus the keyset column)
+        users = CustomUser.objects.only(*self.requested_fields(), 'username')
+        prefix = self.request.query_params.get('search')
+        if prefix:
+            users = users.filter(username__istartswith=prefix)
+        return users
 
-    def get(self, request, *args, **kwargs):
-        # You can list all users or filter based on your needs
-        users = CustomUser.objects.all()  # Get all users
-        serializer = UserSerializer(users, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+    def get_serializer(self, *args, **kwargs):
+        kwargs['fields'] = self.requested_fields()
+        return super().get_serializer(*args, **kwargs)
@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
-User = get_user_model
+User = get_user_model()
 
 # Create your models here.
 class Notification(models.Model):
@@ -16,7 +16,35 @@ class Notification(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     read = models.BooleanField(default=False)
-    
+    # Bursts of the same verb on the same target are coalesced into one row:
+    # `actor` is the latest actor, `actor_count` how many distinct actors it stands for
+    # (counted from NotificationActor) and `timestamp` the time of the latest activity
+    # (see notifications.pipeline)
+    actor_count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # Serves the inbox (unread, by latest activity) and the unread COUNT for a recipient
+            models.Index(fields=['recipient', 'read', 'timestamp'], name='notif_inbox_idx'),
+        ]
 
     def __str__(self):
-        return f"Notification for {self.recipient.username}: {self.verb}"
\ No newline at end of file
+        return f"Notification for {self.recipient.username}: {self.verb}"
+
+    @property
+    def summary(self):
+        others = self.actor_count - 1
+        if others <= 0:
+            return f"{self.actor.username} {self.verb}"
+        return f"{self.actor.username} and {others} other{'s' if others > 1 else ''} {self.verb}"
+
+
+class NotificationActor(models.Model):
+    # The distinct actors folded into a coalesced notification
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name='actors')
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['notification', 'actor'], name='unique_notification_actor'),
+        ]
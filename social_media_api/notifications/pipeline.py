@@ -0,0 +1,256 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.utils import timezone
+from .models import Notification, NotificationActor
+from .unread import adjust_unread
+
+logger = logging.getLogger(__name__)
+
+# Notification writes are taken off the request path: views call notify(), which only
+# puts an event on an in-process queue. Worker threads drain the queue in batches,
+# coalesce events that share (recipient, target, verb) into a single row - folding them
+# into an unread row active in the last NOTIFICATION_COALESCE_WINDOW seconds when there
+# is one - and write each batch with a handful of bulk queries.
+#
+# Events are sharded over the workers by target (or by recipient when there is no
+# target), so a process's workers do not fold into the same row. Workers in other
+# processes still can, so actor_count is never incremented in Python: every actor of a
+# row is recorded once in NotificationActor and the database recounts them. Events
+# queued with notify_author() leave the recipient as None to mean "the target's
+# author"; the worker resolves those for the whole batch with one query per target type.
+
+PendingNotification = namedtuple(
+    'PendingNotification',
+    ['recipient_id', 'actor_id', 'verb', 'target_content_type_id', 'target_object_id', 'created_at'],
+)
+
+
+class NotificationPipeline:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._queues = None
+
+    @property
+    def workers(self):
+        return getattr(settings, 'NOTIFICATION_WORKERS', 2)
+
+    @property
+    def batch_size(self):
+        return getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+
+    @property
+    def flush_interval(self):
+        return getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 0.5)
+
+    @property
+    def coalesce_window(self):
+        return timedelta(seconds=getattr(settings, 'NOTIFICATION_COALESCE_WINDOW', 3600))
+
+    def enqueue(self, event):
+        if not self.workers:
+            # NOTIFICATION_WORKERS = 0 writes synchronously (used by the tests)
+            self.write([event])
+            return
+        queues = self._queues or self._start()
+        # Every event for a given target lands on the same worker, whether or not
+        # its recipient is known yet
+        shard = event.target_object_id if event.target_object_id is not None else event.recipient_id
+        queues[shard % len(queues)].put(event)
+
+    def flush(self):
+        """Write everything still queued, in the calling thread."""
+        for pending in self._queues or []:
+            batch = []
+            while True:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            if batch:
+                self.write(batch)
+
+    def _start(self):
+        with self._lock:
+            if self._queues is None:
+                self._queues = [queue.Queue() for _ in range(self.workers)]
+                for index in range(self.workers):
+                    threading.Thread(
+                        target=self._run, args=(self._queues[index],),
+                        name=f'notification-worker-{index}', daemon=True,
+                    ).start()
+                atexit.register(self.flush)
+        return self._queues
+
+    def _run(self, pending):
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(pending.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            try:
+                self.write(batch)
+            except Exception:
+                logger.exception("Dropped a batch of %d notifications", len(batch))
+            finally:
+                close_old_connections()
+
+    def resolve_recipients(self, batch):
+        unresolved = {}
+        for event in batch:
+            if event.recipient_id is None:
+                unresolved.setdefault(event.target_content_type_id, set()).add(event.target_object_id)
+        if not unresolved:
+            return batch
+
+        authors = {}
+        for content_type_id, object_ids in unresolved.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            for pk, author_id in model._default_manager.filter(pk__in=object_ids).values_list('pk', 'author_id'):
+                authors[(content_type_id, pk)] = author_id
+
+        resolved = []
+        for event in batch:
+            if event.recipient_id is None:
+                author_id = authors.get((event.target_content_type_id, event.target_object_id))
+                if author_id is None:
+                    continue  # target was deleted before the notification was written
+                event = event._replace(recipient_id=author_id)
+            resolved.append(event)
+        return resolved
+
+    def open_rows(self, keys):
+        # One query for every unread row the given keys could fold into, oldest
+        # activity first, so the most recently active row wins a key
+        object_ids = {}
+        for key in keys:
+            object_ids.setdefault(key[1], set()).add(key[2])
+        # Object ids only mean something together with their content type, and
+        # target-less rows need IS NULL: an IN list never matches NULL
+        targets = Q()
+        for content_type_id, ids in object_ids.items():
+            if content_type_id is None:
+                targets |= Q(target_content_type__isnull=True, target_object_id__isnull=True)
+            else:
+                targets |= Q(target_content_type_id=content_type_id, target_object_id__in=ids)
+        return Notification.objects.filter(
+            targets,
+            recipient_id__in={key[0] for key in keys},
+            verb__in={key[3] for key in keys},
+            read=False,
+            timestamp__gte=timezone.now() - self.coalesce_window,
+        ).order_by('timestamp', 'id')
+
+    def write(self, batch):
+        batch = self.resolve_recipients(batch)
+        groups = {}
+        for event in batch:
+            key = (event.recipient_id, event.target_content_type_id, event.target_object_id, event.verb)
+            groups.setdefault(key, []).append(event)
+        if not groups:
+            return [], []
+
+        with transaction.atomic():
+            existing = {row_key(row): row for row in self.open_rows(groups)}
+            created, updated = [], []
+            for key, events in groups.items():
+                latest = events[-1]
+                row = existing.get(key)
+                if row is not None:
+                    row.actor_id = latest.actor_id
+                    row.timestamp = latest.created_at
+                    updated.append(row)
+                else:
+                    created.append(Notification(
+                        recipient_id=latest.recipient_id,
+                        actor_id=latest.actor_id,
+                        verb=latest.verb,
+                        target_content_type_id=latest.target_content_type_id,
+                        target_object_id=latest.target_object_id,
+                        actor_count=len({event.actor_id for event in events}),
+                    ))
+
+            Notification.objects.bulk_create(created, batch_size=self.batch_size)
+            if created and not connection.features.can_return_rows_from_bulk_insert:
+                # MySQL does not hand back the ids of bulk-inserted rows
+                ids = {row_key(row): row.pk for row in self.open_rows([row_key(row) for row in created])}
+                for row in created:
+                    row.pk = ids[row_key(row)]
+
+            rows = {row_key(row): row for row in updated + created}
+            NotificationActor.objects.bulk_create(
+                [
+                    NotificationActor(notification_id=rows[key].pk, actor_id=actor_id)
+                    for key, events in groups.items()
+                    for actor_id in {event.actor_id for event in events}
+                ],
+                ignore_conflicts=True,
+                batch_size=self.batch_size,
+            )
+            if updated:
+                Notification.objects.bulk_update(updated, ['actor', 'timestamp'], batch_size=self.batch_size)
+                # Counted by the database from the recorded actors, so an actor already
+                # folded in is not counted again and concurrent writers cannot lose one
+                Notification.objects.filter(pk__in=[row.pk for row in updated]).update(
+                    actor_count=Subquery(
+                        NotificationActor.objects.filter(notification=OuterRef('pk'))
+                        .values('notification').annotate(count=Count('id')).values('count')
+                    )
+                )
+
+        # Coalesced rows were already unread; only new rows move the counters
+        new_per_recipient = {}
+        for row in created:
+            new_per_recipient[row.recipient_id] = new_per_recipient.get(row.recipient_id, 0) + 1
+        for recipient_id, count in new_per_recipient.items():
+            adjust_unread(recipient_id, count)
+        return created, updated
+
+
+def row_key(row):
+    return (row.recipient_id, row.target_content_type_id, row.target_object_id, row.verb)
+
+
+pipeline = NotificationPipeline()
+
+
+def notify(recipient, actor, verb, target=None):
+    """Queue a notification; it is written (and possibly coalesced) by a background worker."""
+    pipeline.enqueue(PendingNotification(
+        recipient_id=recipient.id,
+        actor_id=actor.id,
+        verb=verb,
+        target_content_type_id=ContentType.objects.get_for_model(target).id if target is not None else None,
+        target_object_id=target.pk if target is not None else None,
+        created_at=timezone.now(),
+    ))
+
+
+def notify_author(model, object_id, actor, verb):
+    """
+    Queue a notification to the author of the `model` row `object_id` without loading
+    it; the worker looks the author up along with the rest of its batch.
+    """
+    pipeline.enqueue(PendingNotification(
+        recipient_id=None,
+        actor_id=actor.id,
+        verb=verb,
+        target_content_type_id=ContentType.objects.get_for_model(model).id,
+        target_object_id=object_id,
+        created_at=timezone.now(),
+    ))
@@ -0,0 +1,40 @@
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.contrib.contenttypes.prefetch import GenericPrefetch
+from rest_framework import serializers
+from .models import Notification
+
+def target_prefetch():
+    """
+    Prefetch for Notification.target: targets are grouped by content type and each type
+    is loaded with one IN query, using a queryset that already joins whatever the
+    target's __str__ needs (a comment renders its author and post).
+    """
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    return GenericPrefetch('target', [
+        Post.objects.all(),
+        Comment.objects.select_related('author', 'post'),
+        get_user_model().objects.all(),
+    ])
+
+class NotificationSerializer(serializers.ModelSerializer):
+    actor = serializers.StringRelatedField(read_only=True)
+    target = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Notification
+        fields = ['id', 'verb', 'summary', 'actor', 'actor_count', 'target', 'created_at', 'timestamp', 'read']
+
+    def get_target(self, notification):
+        if notification.target_content_type_id is None:
+            return None
+        # get_for_id is served from ContentType's in-process cache, not the database
+        content_type = ContentType.objects.get_for_id(notification.target_content_type_id)
+        target = notification.target
+        return {
+            "type": content_type.model,
+            "id": notification.target_object_id,
+            "display": str(target) if target is not None else None,
+        }
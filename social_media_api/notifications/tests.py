@@ -1,3 +1,160 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+from posts.models import Post, Comment
+from social_media_api.testing import ConstantQueriesMixin, without_ssl_redirect
+from .models import Notification
+from .pipeline import PendingNotification, notify, pipeline
+
+User = get_user_model()
 
 # Create your tests here.
+@override_settings(NOTIFICATION_WORKERS=0)
+class NotificationPipelineTestCase(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="password")
+        self.post = Post.objects.create(author=self.author, title="Viral", content="Post")
+        self.fans = [User.objects.create_user(username=f"fan{i}", password="password") for i in range(3)]
+
+    def like_event(self, actor):
+        return PendingNotification(
+            recipient_id=self.author.id,
+            actor_id=actor.id,
+            verb="liked your post",
+            target_content_type_id=ContentType.objects.get_for_model(Post).id,
+            target_object_id=self.post.id,
+            created_at=timezone.now(),
+        )
+
+    def test_batch_is_coalesced_into_one_row(self):
+        created, updated = pipeline.write([self.like_event(fan) for fan in self.fans])
+        self.assertEqual((len(created), len(updated)), (1, 0))
+
+        notification = Notification.objects.get()
+        self.assertEqual(notification.actor, self.fans[-1])
+        self.assertEqual(notification.summary, "fan2 and 2 others liked your post")
+
+    def test_later_events_fold_into_unread_row(self):
+        notify(recipient=self.author, actor=self.fans[0], verb="liked your post", target=self.post)
+        notify(recipient=self.author, actor=self.fans[1], verb="liked your post", target=self.post)
+        self.assertEqual(Notification.objects.get().actor_count, 2)
+
+    def test_repeat_actor_is_counted_once(self):
+        # like, unlike, like again from the same fan, in separate batches
+        for fan in (self.fans[0], self.fans[1], self.fans[0]):
+            pipeline.write([self.like_event(fan)])
+        notification = Notification.objects.get()
+        self.assertEqual((notification.actor, notification.actor_count), (self.fans[0], 2))
+
+    def test_window_follows_latest_activity(self):
+        pipeline.write([self.like_event(self.fans[0])])
+        # Created long ago, but active just now
+        Notification.objects.update(created_at=timezone.now() - timedelta(days=1))
+        pipeline.write([self.like_event(self.fans[1])])
+        self.assertEqual(Notification.objects.get().actor_count, 2)
+
+        Notification.objects.update(timestamp=timezone.now() - timedelta(days=1))
+        pipeline.write([self.like_event(self.fans[2])])
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_read_rows_are_not_reused(self):
+        notify(recipient=self.author, actor=self.fans[0], verb="liked your post", target=self.post)
+        Notification.objects.update(read=True)
+        notify(recipient=self.author, actor=self.fans[1], verb="liked your post", target=self.post)
+        self.assertEqual(Notification.objects.count(), 2)
+
+    def test_targetless_events_coalesce_without_returning(self):
+        # MySQL hands back no ids from bulk_create; the new rows are looked up again
+        features = type(connection.features)
+        with mock.patch.object(features, "can_return_rows_from_bulk_insert", new_callable=mock.PropertyMock, return_value=False):
+            created, _ = pipeline.write([
+                PendingNotification(self.author.id, fan.id, "followed you", None, None, timezone.now())
+                for fan in self.fans[:2]
+            ])
+            self.assertIsNotNone(created[0].pk)
+            notify(recipient=self.author, actor=self.fans[2], verb="followed you")
+        notification = Notification.objects.get()
+        self.assertEqual((notification.actor, notification.actor_count), (self.fans[2], 3))
+
+
+@without_ssl_redirect
+@override_settings(NOTIFICATION_WORKERS=0)
+class NotificationInboxTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.actor = User.objects.create_user(username="actor", password="password")
+        self.posts = [Post.objects.create(author=self.user, title=f"Post {i}", content="Body") for i in range(3)]
+        for post in self.posts:
+            notify(recipient=self.user, actor=self.actor, verb="liked your post", target=post)
+        self.notifications = list(Notification.objects.order_by('id'))
+        self.client.force_authenticate(self.user)
+
+    def unread(self):
+        return self.client.get(reverse("notification-unread-count")).data["unread_count"]
+
+    def test_inbox_is_paginated(self):
+        response = self.client.get(reverse("notification-list"), {"page_size": 2})
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIsNotNone(response.data["next"])
+        self.assertEqual(response.data["unread_count"], 3)
+
+    def test_inbox_is_ordered_by_latest_activity(self):
+        other = User.objects.create_user(username="other", password="password")
+        notify(recipient=self.user, actor=other, verb="liked your post", target=self.posts[0])
+        response = self.client.get(reverse("notification-list"))
+        self.assertEqual(response.data["results"][0]["id"], self.notifications[0].id)
+
+    def test_counter_follows_creates_and_reads(self):
+        self.assertEqual(self.unread(), 3)
+        notify(recipient=self.user, actor=self.actor, verb="followed you")
+        self.assertEqual(self.unread(), 4)
+
+        self.client.post(reverse("mark-notification-read", kwargs={"notification_id": self.notifications[0].id}))
+        self.client.post(reverse("mark-notification-read", kwargs={"notification_id": self.notifications[0].id}))
+        self.assertEqual(self.unread(), 3)
+
+    def test_mark_all_read_up_to_id(self):
+        response = self.client.post(reverse("mark-all-notifications-read"), {"up_to": self.notifications[1].id})
+        self.assertEqual(response.data["marked"], 2)
+        self.assertEqual(self.unread(), 1)
+        self.assertEqual(len(self.client.get(reverse("notification-list")).data["results"]), 1)
+
+
+@without_ssl_redirect
+@override_settings(NOTIFICATION_WORKERS=0)
+class NotificationTargetTestCase(ConstantQueriesMixin, APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="user", password="password")
+        self.client.force_authenticate(self.user)
+        self.add_mixed_notifications()
+        # Warm the unread counter so it does not count as a query below
+        self.client.get(reverse("notification-unread-count"))
+
+    def add_mixed_notifications(self):
+        actor = User.objects.create_user(username=f"actor{User.objects.count()}", password="password")
+        post = Post.objects.create(author=self.user, title="Post", content="Body")
+        comment = Comment.objects.create(post=post, author=actor, content="Nice")
+        notify(recipient=self.user, actor=actor, verb="liked your post", target=post)
+        notify(recipient=self.user, actor=actor, verb="commented on your post", target=comment)
+        notify(recipient=self.user, actor=actor, verb="followed you", target=actor)
+
+    def test_targets_cost_one_query_per_content_type(self):
+        # notifications + actors, then one query each for posts, comments and users
+        self.assertConstantQueries(4, reverse("notification-list"), self.add_mixed_notifications)
+
+    def test_target_is_rendered(self):
+        response = self.client.get(reverse("notification-list"))
+        targets = {n["target"]["type"]: n["target"]["display"] for n in response.data["results"]}
+        self.assertEqual(targets["post"], "Post")
+        self.assertEqual(targets["comment"], "Comment by actor1 on Post")
+        self.assertEqual(targets["customuser"], "actor1")
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.cache import cache
+from .models import Notification
+
+# Per-user unread notification counter, kept in the Django cache.
+# A miss is filled with one COUNT on the (recipient, read, timestamp) index;
+# writers adjust the cached value in place and never create it, so a counter
+# that was evicted is simply recounted on the next read.
+
+def cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+def unread_count(user_id):
+    count = cache.get(cache_key(user_id))
+    if count is None:
+        count = Notification.objects.filter(recipient_id=user_id, read=False).count()
+        cache.set(cache_key(user_id), count, getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 86400))
+    return count
+
+def adjust_unread(user_id, delta):
+    try:
+        if cache.incr(cache_key(user_id), delta) < 0:
+            cache.delete(cache_key(user_id))
+    except ValueError:
+        # Not cached: the next unread_count() will count from the database
+        pass
+
+def reset_unread(user_id):
+    cache.delete(cache_key(user_id))
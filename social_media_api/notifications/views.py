@@ -1,29 +1,68 @@
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework import status, permissions
+from rest_framework import status, permissions, generics
 from .models import Notification
+from .serializers import NotificationSerializer, target_prefetch
+from .unread import unread_count, adjust_unread, reset_unread
+from social_media_api.pagination import KeysetPagination
 
 # Create your views here.
-class NotificationListView(APIView):
+class NotificationPagination(KeysetPagination):
+    # Coalescing moves `timestamp` to the latest activity, which is what the inbox sorts by
+    ordering = ('-timestamp', '-id')
+
+class NotificationListView(generics.ListAPIView):
+    # Unread notifications, latest activity first; ?include_read=true lists the whole inbox
+    serializer_class = NotificationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = NotificationPagination
 
-    def get(self, request):
-        notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-        unread_notifications = notifications.filter(read=False)
-        data = [{"verb": notif.verb, "created_at": notif.created_at} for notif in unread_notifications]
+    def get_queryset(self):
+        notifications = (
+            Notification.objects.filter(recipient=self.request.user)
+            .select_related('actor')
+            .prefetch_related(target_prefetch())
+        )
+        if self.request.query_params.get('include_read') not in ('true', '1'):
+            notifications = notifications.filter(read=False)
+        return notifications
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['unread_count'] = unread_count(self.request.user.id)
+        return response
+
+class UnreadNotificationCountView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
 
-        return Response(data, status=status.HTTP_200_OK)
+    def get(self, request):
+        return Response({"unread_count": unread_count(request.user.id)}, status=status.HTTP_200_OK)
     
 class MarkNotificationReadView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, notification_id):
-        try:
-            notification = Notification.objects.get(id=notification_id, recipient=request.user)
-            notification.read = True
-            notification.save()
-            return Response({"detail": "Notification marked as read"}, status=status.HTTP_200_OK)
-
-        except Notification.DoesNotExist:
-            return Response({"detail": "Notification Not Found"}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
+        # One conditional UPDATE; the counter only moves if the row was unread
+        marked = Notification.objects.filter(id=notification_id, recipient=request.user, read=False).update(read=True)
+        if marked:
+            adjust_unread(request.user.id, -marked)
+        elif not Notification.objects.filter(id=notification_id, recipient=request.user).exists():
+            return Response({"detail": "Notification Not Found"}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"detail": "Notification marked as read"}, status=status.HTTP_200_OK)
+
+class MarkAllNotificationsReadView(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        # Marks every unread notification up to and including `up_to` (an id) as read
+        notifications = Notification.objects.filter(recipient=request.user, read=False)
+        up_to = request.data.get('up_to')
+        if up_to is not None:
+            try:
+                notifications = notifications.filter(id__lte=int(up_to))
+            except (TypeError, ValueError):
+                return Response({"detail": "up_to must be a notification id"}, status=status.HTTP_400_BAD_REQUEST)
+        marked = notifications.update(read=True)
+        reset_unread(request.user.id)
+        return Response({"detail": "Notifications marked as read", "marked": marked}, status=status.HTTP_200_OK)
@@ -0,0 +1,9 @@
+from django.core.checks import register
+from social_media_api.checks import shared_cache_errors
+
+
+@register()
+def liked_posts_cache_check(app_configs, **kwargs):
+    # A like or unlike drops the user's entry only in the process that records it,
+    # so a per-process cache would keep answering liked_by_me wrongly elsewhere
+    return shared_cache_errors('LIKED_POSTS_CACHE', 'posts.E001')
@@ -0,0 +1,82 @@
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, Value, When
+from .models import Like
+
+# Per-user cache of recently liked post ids, behind PostSerializer.liked_by_me.
+# Each entry holds the ids of the user's LIKED_POSTS_CACHE_SIZE most recent likes as a
+# sorted array of 64-bit ints (8 bytes per id; membership is a binary search), plus a
+# flag saying whether that is every like the user has. Older likes are evicted by the
+# size cap. A page of posts is answered from the entry, and only ids it cannot vouch
+# for cost one IN query; a missing entry is filled by the same single query that
+# answers the page.
+# Entries are dropped by posts.likes whenever the user likes or unlikes something -
+# in the process handling the change - so LIKED_POSTS_CACHE must be shared by every
+# worker process (see the posts.E001 check).
+
+def liked_cache():
+    return caches[getattr(settings, 'LIKED_POSTS_CACHE', 'default')]
+
+def timeout():
+    return getattr(settings, 'LIKED_POSTS_CACHE_TIMEOUT', 60)
+
+def cache_size():
+    return getattr(settings, 'LIKED_POSTS_CACHE_SIZE', 1000)
+
+def cache_key(user_id):
+    return f'liked_posts:{user_id}'
+
+def store(user_id, post_ids, complete):
+    ids = array('q', sorted(post_ids))
+    liked_cache().set(cache_key(user_id), (complete, ids.tobytes()), timeout())
+
+def cached_liked_ids(user_id):
+    """(sorted array of recently liked post ids, whether it holds all of the user's likes), or None."""
+    entry = liked_cache().get(cache_key(user_id))
+    if entry is None:
+        return None
+    complete, packed = entry
+    ids = array('q')
+    ids.frombytes(packed)
+    return ids, complete
+
+def load(user_id, post_ids):
+    """Answer `post_ids` and refill the user's entry with one query."""
+    # The page's likes sort first and the rest by recency, so the rows hold every
+    # like on the page plus enough of the latest others to rebuild the entry
+    size = cache_size()
+    on_page = Case(When(post_id__in=post_ids, then=Value(0)), default=Value(1))
+    rows = list(
+        Like.objects.filter(user_id=user_id).order_by(on_page, '-created_at', '-id')
+        .values_list('post_id', 'created_at', 'id')[:size + len(post_ids) + 1]
+    )
+    page = set(post_ids)
+    recent = sorted(rows, key=lambda row: (row[1], row[2]), reverse=True)[:size]
+    store(user_id, [post_id for post_id, _, _ in recent], complete=len(rows) <= size)
+    return {post_id for post_id, _, _ in rows if post_id in page}
+
+def contains(ids, post_id):
+    index = bisect_left(ids, post_id)
+    return index < len(ids) and ids[index] == post_id
+
+def liked_post_ids(user, post_ids):
+    """The subset of `post_ids` that `user` has liked."""
+    if user is None or not user.is_authenticated or not post_ids:
+        return set()
+    entry = cached_liked_ids(user.id)
+    if entry is None:
+        return load(user.id, post_ids)
+    ids, complete = entry
+    liked = {post_id for post_id in post_ids if contains(ids, post_id)}
+    unknown = set(post_ids) - liked
+    if unknown and not complete:
+        liked.update(
+            Like.objects.filter(user_id=user.id, post_id__in=unknown).values_list('post_id', flat=True)
+        )
+    return liked
+
+def invalidate(user_id):
+    liked_cache().delete(cache_key(user_id))
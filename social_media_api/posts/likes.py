@@ -0,0 +1,105 @@
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from . import liked as liked_cache
+from .models import Post, Like
+
+# Like/unlike as single-statement upserts and deletes.
+# A like is one INSERT ... SELECT that only inserts rows for posts that exist and
+# are not the liker's own, and that skips rows already present instead of failing
+# on the (user, post) unique constraint: ON CONFLICT DO NOTHING on SQLite/PostgreSQL,
+# a no-op ON DUPLICATE KEY UPDATE on MySQL. There is no read-then-write window, so
+# concurrent likes of the same post cannot race each other into an IntegrityError.
+# Where the database has RETURNING the statement itself reports the rows it inserted;
+# on MySQL they are told apart from a locked read made just before it.
+# Every change drops the user's entry in the liked-posts cache (posts.liked).
+
+def _insert_likes_sql(post_count, returning):
+    quote = connection.ops.quote_name
+    like_table = quote(Like._meta.db_table)
+    post_table = quote(Post._meta.db_table)
+    like_pk_col = quote(Like._meta.pk.column)
+    user_col = quote(Like._meta.get_field('user').column)
+    post_col = quote(Like._meta.get_field('post').column)
+    created_col = quote(Like._meta.get_field('created_at').column)
+    author_col = quote(Post._meta.get_field('author').column)
+    pk_col = quote(Post._meta.pk.column)
+    placeholders = ', '.join(['%s'] * post_count)
+
+    if connection.vendor == 'mysql':
+        # Unlike INSERT IGNORE, this only skips the duplicate key and still raises
+        # on any other error
+        on_conflict = f' ON DUPLICATE KEY UPDATE {like_table}.{like_pk_col} = {like_table}.{like_pk_col}'
+    else:
+        on_conflict = f' ON CONFLICT ({user_col}, {post_col}) DO NOTHING'
+    return (
+        f'INSERT INTO {like_table} ({user_col}, {post_col}, {created_col}) '
+        f'SELECT %s, {pk_col}, %s FROM {post_table} '
+        f'WHERE {pk_col} IN ({placeholders}) AND {author_col} <> %s{on_conflict}'
+        + (f' RETURNING {post_col}' if returning else '')
+    )
+
+@transaction.atomic
+def _insert_likes(user, post_ids):
+    """Insert the user's likes of `post_ids`; returns the ids of the posts it newly liked."""
+    returning = connection.features.can_return_rows_from_bulk_insert
+    params = [user.id, connection.ops.adapt_datetimefield_value(timezone.now()), *post_ids, user.id]
+    with connection.cursor() as cursor:
+        if returning:
+            cursor.execute(_insert_likes_sql(len(post_ids), returning), params)
+            return {row[0] for row in cursor.fetchall()}
+
+        # No RETURNING: lock the posts (in a fixed order, against deadlocks) so no
+        # other like of them can land between reading their likes and inserting
+        candidates = set(
+            Post.objects.select_for_update().filter(pk__in=post_ids).exclude(author_id=user.id)
+            .order_by('pk').values_list('pk', flat=True)
+        )
+        existing = set(Like.objects.filter(user=user, post_id__in=candidates).values_list('post_id', flat=True))
+        cursor.execute(_insert_likes_sql(len(post_ids), returning), params)
+        return candidates - existing
+
+def like_post(user, post_id):
+    """Like one post. Returns False if nothing changed (already liked, own post or no such post)."""
+    with transaction.atomic():
+        liked = bool(_insert_likes(user, [post_id]))
+        if liked:
+            Post.objects.filter(pk=post_id).update(like_count=F('like_count') + 1)
+    if liked:
+        liked_cache.invalidate(user.id)
+    return liked
+
+def unlike_post(user, post_id):
+    """Remove a like with one DELETE. Returns False if there was none."""
+    with transaction.atomic():
+        deleted, _ = Like.objects.filter(user=user, post_id=post_id).delete()
+        if deleted:
+            Post.objects.filter(pk=post_id).update(like_count=F('like_count') - 1)
+    if deleted:
+        liked_cache.invalidate(user.id)
+    return bool(deleted)
+
+def like_posts(user, post_ids):
+    """Like many posts at once. Returns the ids of the posts that became liked."""
+    post_ids = list(set(post_ids))
+    if not post_ids:
+        return set()
+    with transaction.atomic():
+        liked = _insert_likes(user, post_ids)
+        if liked:
+            Post.objects.filter(pk__in=liked).update(like_count=F('like_count') + 1)
+    if liked:
+        liked_cache.invalidate(user.id)
+    return liked
+
+def unlike_posts(user, post_ids):
+    """Unlike many posts at once. Returns the ids of the posts that were unliked."""
+    with transaction.atomic():
+        likes = Like.objects.select_for_update().filter(user=user, post_id__in=set(post_ids))
+        unliked = set(likes.values_list('post_id', flat=True))
+        if unliked:
+            Like.objects.filter(user=user, post_id__in=unliked).delete()
+            Post.objects.filter(pk__in=unliked).update(like_count=F('like_count') - 1)
+    if unliked:
+        liked_cache.invalidate(user.id)
+    return unliked
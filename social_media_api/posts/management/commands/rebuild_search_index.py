@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from posts.models import Post
+from posts.search import search_backend
+
+
+class Command(BaseCommand):
+    help = "Index every post with the configured POST_SEARCH_BACKEND, one batch of posts at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        backend = search_backend()
+        batch_size = options['batch_size']
+        last_id = 0
+        indexed = 0
+
+        while True:
+            posts = list(
+                Post.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'title', 'content', 'search_length')[:batch_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].id
+            for post in posts:
+                backend.index(post)
+            indexed += len(posts)
+
+        self.stdout.write(self.style.SUCCESS(f"Indexed {indexed} posts with {type(backend).__name__}."))
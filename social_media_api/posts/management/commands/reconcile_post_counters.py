@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from posts.models import Post, Like, Comment
+
+
+class Command(BaseCommand):
+    help = "Repair drift in Post.like_count and Post.comment_count, one batch of posts at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        checked = repaired = 0
+
+        while True:
+            # Walk the table by primary key so each batch is an index range read
+            posts = list(
+                Post.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'like_count', 'comment_count')[:batch_size]
+            )
+            if not posts:
+                break
+            last_id = posts[-1].id
+            ids = [post.id for post in posts]
+
+            like_counts = dict(
+                Like.objects.filter(post_id__in=ids).values_list('post_id')
+                .annotate(n=Count('id')).values_list('post_id', 'n')
+            )
+            comment_counts = dict(
+                Comment.objects.filter(post_id__in=ids).values_list('post_id')
+                .annotate(n=Count('id')).values_list('post_id', 'n')
+            )
+
+            drifted = [
+                post.id for post in posts
+                if post.like_count != like_counts.get(post.id, 0)
+                or post.comment_count != comment_counts.get(post.id, 0)
+            ]
+            if drifted:
+                # Recount inside the UPDATE itself so likes/comments written since the
+                # read above are not lost
+                Post.objects.filter(id__in=drifted).update(
+                    like_count=self.recount(Like),
+                    comment_count=self.recount(Comment),
+                )
+            checked += len(posts)
+            repaired += len(drifted)
+
+        self.stdout.write(self.style.SUCCESS(f"Checked {checked} posts, repaired {repaired}."))
+
+    def recount(self, model):
+        counts = (
+            model.objects.filter(post_id=OuterRef('pk')).order_by()
+            .values('post_id').annotate(n=Count('id')).values('n')
+        )
+        return Coalesce(Subquery(counts), Value(0))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import F
 from django.contrib.auth import get_user_model
 
 # Create your models here.
@@ -10,9 +11,23 @@ class Post(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized counters, kept in step by the like/comment views and repaired
+    # by the reconcile_post_counters management command
+    like_count = models.PositiveIntegerField(default=0)
+    comment_count = models.PositiveIntegerField(default=0)
+    # Number of indexed tokens in title + content, for BM25 length normalization
+    search_length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        # Backs keyset pagination on (created_at, id)
+        indexes = [models.Index(fields=['created_at', 'id'], name='post_created_id_idx')]
 
     def __str__(self):
         return self.title
+
+    def adjust_counter(self, field, delta):
+        # Single UPDATE ... SET field = field + delta, safe under concurrent writers
+        Post.objects.filter(pk=self.pk).update(**{field: F(field) + delta})
     
 class Comment(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="comments")
@@ -21,6 +36,9 @@ class Comment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [models.Index(fields=['created_at', 'id'], name='comment_created_id_idx')]
+
     def __str__(self):
         return f"Comment by {self.author} on {self.post}"
     
@@ -33,4 +51,40 @@ class Like(models.Model):
         unique_together = ('user', 'post')
 
     def __str__(self):
-        return f"{self.user.username} likes {self.post.title}"
\ No newline at end of file
+        return f"{self.user.username} likes {self.post.title}"
+
+class TimelineEntry(models.Model):
+    # One row per (follower, post): the materialized home timeline written on post creation
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timeline_entries")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    created_at = models.DateTimeField()  # copy of post.created_at so the timeline is ordered without a join
+
+    class Meta:
+        unique_together = ('owner', 'post')
+        indexes = [
+            # A feed page is one range read: owner, then the (created_at, post) keyset
+            models.Index(fields=['owner', '-created_at', '-post'], name='timeline_owner_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.post} in {self.owner.username}'s timeline"
+
+class SearchTerm(models.Model):
+    # Dictionary of the inverted index behind posts.search.DatabaseSearchBackend
+    term = models.CharField(max_length=64, unique=True)
+    document_count = models.PositiveIntegerField(default=0)  # posts containing the term
+
+    def __str__(self):
+        return self.term
+
+class SearchPosting(models.Model):
+    term = models.ForeignKey(SearchTerm, on_delete=models.CASCADE, related_name="postings")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="search_postings")
+    frequency = models.PositiveIntegerField()  # occurrences of the term in the post
+
+    class Meta:
+        # Its index, led by term, is the posting list read by a search
+        unique_together = ('term', 'post')
+
+    def __str__(self):
+        return f"{self.term} in {self.post}"
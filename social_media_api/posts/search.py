@@ -0,0 +1,216 @@
+import json
+from abc import ABC, abstractmethod
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Sum, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Round
+from django.utils.module_loading import import_string
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import BaseFilterBackend
+from social_media_api.pagination import KeysetPagination
+from . import bm25
+from .models import Post, SearchTerm
+
+# Full-text search over posts.Post, replacing SearchFilter's LIKE '%term%' scans.
+# A backend annotates the matching posts with `search_rank` (higher is better); the
+# view orders and pages on (search_rank, id) with SearchRankPagination. The backend
+# is chosen with POST_SEARCH_BACKEND:
+#
+# - DatabaseSearchBackend (default): an inverted index in the SearchTerm and
+#   SearchPosting tables, updated incrementally from posts.signals on save/delete and
+#   ranked by BM25 in SQL (posts.bm25). Works on any database. The corpus statistics
+#   a search starts with are frozen into its cursors, so every page of it ranks
+#   alike however the index changes in between.
+# - MySQLFullTextBackend: MATCH ... AGAINST over the FULLTEXT index created by
+#   migration 0006. InnoDB ranks with its own TF-IDF variant rather than BM25.
+# - SQLiteFTS5Backend: the posts_post_fts FTS5 table created by migration 0006,
+#   ranked by FTS5's bm25().
+#
+# A query matches posts containing any of its terms. Each search reads only the
+# posting lists of those terms, so its cost follows the number of matches rather
+# than the size of the corpus. The rebuild_search_index command indexes existing posts.
+
+MAX_TERM_LENGTH = 64
+# Digits kept in search_rank, so the value in a pagination cursor compares equal
+# to the one the database computes again for the next page
+RANK_PRECISION = 6
+
+def tokenize(text):
+    """Lowercased word tokens of `text`, as indexed and as searched."""
+    return bm25.tokenize(text, MAX_TERM_LENGTH)
+
+def post_tokens(post):
+    return tokenize(f'{post.title} {post.content}')
+
+def search_terms(query):
+    """Distinct terms of a search query, in the order they were typed."""
+    return list(dict.fromkeys(tokenize(query or '')))
+
+
+class SearchBackend(ABC):
+    def index(self, post):
+        """Add or refresh `post` in the index."""
+
+    def remove(self, post):
+        """Drop `post` from the index; called before it is deleted."""
+
+    def ranking_stats(self, terms):
+        """
+        The corpus statistics a search for `terms` is ranked with, as JSON-ready data,
+        or None when the backend cannot rank against given statistics.
+        """
+        return None
+
+    @abstractmethod
+    def search(self, queryset, terms, stats=None):
+        """
+        Filter `queryset` to posts matching any of `terms`, annotated with search_rank,
+        ranked against `stats` (from ranking_stats) when given.
+        """
+
+
+class DatabaseSearchBackend(SearchBackend):
+    stats_key = 'post_search:corpus_stats'
+
+    def stats_timeout(self):
+        return getattr(settings, 'POST_SEARCH_STATS_TIMEOUT', 300)
+
+    def ranking_stats(self, terms):
+        # Post count and average length only steer BM25's idf and length
+        # normalization, so a few minutes' staleness does not matter
+        documents, average_length = bm25.corpus_stats(self.stats_key, self.stats_timeout())
+        document_counts = SearchTerm.objects.filter(term__in=terms, document_count__gt=0).values_list(
+            'id', 'document_count'
+        )
+        return {'documents': documents, 'length': average_length, 'terms': dict(document_counts)}
+
+    def index(self, post):
+        tokens = post_tokens(post)
+        bm25.update_postings(post, Counter(tokens), len(tokens))
+
+    def remove(self, post):
+        bm25.remove_postings(post)
+
+    def search(self, queryset, terms, stats=None):
+        stats = stats or self.ranking_stats(terms)
+        document_counts = stats['terms']
+        if not document_counts:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField())).none()
+        score = bm25.score(document_counts, stats['documents'], stats['length'])
+        # Filtering on the postings before annotating makes the Sum run over the
+        # same join: one row per (post, matched term)
+        return queryset.filter(search_postings__term_id__in=document_counts).annotate(
+            search_rank=Round(Sum(score, output_field=FloatField()), RANK_PRECISION)
+        )
+
+
+class MySQLFullTextBackend(SearchBackend):
+    # InnoDB maintains the FULLTEXT index itself, so index() and remove() are no-ops
+
+    def search(self, queryset, terms, stats=None):
+        table = connection.ops.quote_name(Post._meta.db_table)
+        columns = ', '.join(f'{table}.{connection.ops.quote_name(column)}' for column in ('title', 'content'))
+        match = f'MATCH ({columns}) AGAINST (%s IN NATURAL LANGUAGE MODE)'
+        rank = RawSQL(match, [' '.join(terms)], output_field=FloatField())
+        # The bare MATCH in WHERE is what lets MySQL answer from the FULLTEXT index
+        return queryset.alias(search_match=rank).filter(search_match__gt=0).annotate(
+            search_rank=Round(rank, RANK_PRECISION)
+        )
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    table = 'posts_post_fts'
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, content) VALUES (%s, %s, %s)',
+                [post.pk, post.title, post.content],
+            )
+
+    def remove(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [post.pk])
+
+    def search(self, queryset, terms, stats=None):
+        # Quote every term so nothing the user typed is read as FTS5 query syntax
+        match = ' OR '.join('"{}"'.format(term.replace('"', '""')) for term in terms)
+        post_id = '{}.{}'.format(
+            connection.ops.quote_name(Post._meta.db_table), connection.ops.quote_name(Post._meta.pk.column)
+        )
+        # bm25() is lower-is-better, hence the negation
+        rank = RawSQL(
+            f'SELECT -bm25({self.table}) FROM {self.table} WHERE {self.table} MATCH %s AND rowid = {post_id}',
+            [match], output_field=FloatField(),
+        )
+        matching = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match])
+        return queryset.filter(pk__in=matching).annotate(search_rank=Round(rank, RANK_PRECISION))
+
+
+_backend = None
+
+def search_backend():
+    global _backend
+    path = getattr(settings, 'POST_SEARCH_BACKEND', 'posts.search.DatabaseSearchBackend')
+    if _backend is None or _backend[0] != path:
+        _backend = (path, import_string(path)())
+    return _backend[1]
+
+
+class PostSearchFilter(BaseFilterBackend):
+    """Full-text `?search=` filter for post lists, ranked by the configured backend."""
+    search_param = 'search'
+
+    @classmethod
+    def terms(cls, request):
+        return search_terms(request.query_params.get(cls.search_param))
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.terms(request)
+        if not terms:
+            return queryset
+        backend = search_backend()
+        # Later pages are ranked with the statistics frozen in their cursor, so
+        # index changes between requests cannot move the page boundaries
+        stats = SearchRankPagination().cursor_stats(request)
+        if stats is None:
+            stats = backend.ranking_stats(terms)
+        request.search_stats = stats
+        return backend.search(queryset, terms, stats)
+
+
+class SearchRankPagination(KeysetPagination):
+    """Keyset pages over search results, best match first."""
+    ordering = ('-search_rank', '-id')
+    stats_token = 's'
+
+    def to_python(self, name, value):
+        if name == 'search_rank':
+            return float(value)
+        return super().to_python(name, value)
+
+    def cursor_extra(self):
+        stats = getattr(self.request, 'search_stats', None)
+        return {} if stats is None else {self.stats_token: json.dumps(stats)}
+
+    def cursor_stats(self, request):
+        """The ranking statistics frozen in the request's cursor, or None."""
+        tokens = self.cursor_tokens(request)
+        if not tokens or self.stats_token not in tokens:
+            return None
+        try:
+            stats = json.loads(tokens[self.stats_token][0])
+            stats = {
+                'documents': int(stats['documents']),
+                'length': float(stats['length']),
+                'terms': {int(term_id): int(count) for term_id, count in stats['terms'].items()},
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        if stats['length'] <= 0:
+            raise NotFound(self.invalid_cursor_message)
+        return stats
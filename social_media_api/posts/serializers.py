@@ -1,18 +1,76 @@
+from django.conf import settings
+from django.db.models import Prefetch
+from django.db.models.manager import BaseManager
 from rest_framework import serializers
+from .liked import liked_post_ids
 from .models import Post, Comment
 
 class CommentSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
     post = serializers.StringRelatedField(read_only=True)
+    post_id = serializers.PrimaryKeyRelatedField(source='post', queryset=Post.objects.all(), write_only=True)
 
     class Meta:
         model = Comment
-        fields = ['id', 'post', 'author', 'content', 'created_at', 'updated_at']
+        fields = ['id', 'post', 'post_id', 'author', 'content', 'created_at', 'updated_at']
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # author and post are rendered with str(), so join them in the list query
+        return queryset.select_related('author', 'post')
+
+def comments_preview_size():
+    return getattr(settings, 'POST_COMMENTS_PREVIEW_SIZE', 10)
+
+class PostListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        # Resolve liked_by_me for the whole page at once instead of once per post
+        posts = list(data.all() if isinstance(data, BaseManager) else data)
+        request = self.context.get('request')
+        self.context['liked_post_ids'] = liked_post_ids(
+            getattr(request, 'user', None), [post.pk for post in posts]
+        )
+        return super().to_representation(posts)
 
 class PostSerializer(serializers.ModelSerializer):
     author = serializers.StringRelatedField(read_only=True)
-    comments = CommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
+    liked_by_me = serializers.SerializerMethodField()
 
     class Meta:
         model = Post
-        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at', 'comments']
\ No newline at end of file
+        fields = ['id', 'author', 'title', 'content', 'created_at', 'updated_at',
+                  'like_count', 'comment_count', 'liked_by_me', 'comments']
+        read_only_fields = ['like_count', 'comment_count']
+        list_serializer_class = PostListSerializer
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        # Only the latest POST_COMMENTS_PREVIEW_SIZE comments are inlined per post; the
+        # sliced Prefetch runs as a single windowed query for the whole page.
+        # Comment.post needs no join: the prefetch points it back at the parent post.
+        latest_comments = (
+            Comment.objects.select_related('author')
+            .order_by('-created_at', '-id')[:comments_preview_size()]
+        )
+        return queryset.select_related('author').prefetch_related(
+            Prefetch('comments', queryset=latest_comments, to_attr='latest_comments')
+        )
+
+    def get_comments(self, post):
+        comments = getattr(post, 'latest_comments', None)
+        if comments is None:
+            # Not loaded through setup_eager_loading (e.g. a freshly created post)
+            comments = (
+                post.comments.select_related('author')
+                .order_by('-created_at', '-id')[:comments_preview_size()]
+            )
+        return CommentSerializer(comments, many=True).data
+
+    def get_liked_by_me(self, post):
+        liked = self.context.get('liked_post_ids')
+        if liked is None:
+            # Serialized on its own (retrieve/create) rather than as part of a page
+            request = self.context.get('request')
+            liked = liked_post_ids(getattr(request, 'user', None), [post.pk])
+        return post.pk in liked
@@ -0,0 +1,34 @@
+from django.db.models.signals import m2m_changed, post_save, pre_delete
+from django.dispatch import receiver
+from django.contrib.auth import get_user_model
+from .models import Post
+from .search import search_backend
+from .timeline import backfill_timeline, prune_timeline
+
+User = get_user_model()
+
+@receiver(m2m_changed, sender=User.followers.through)
+def sync_timeline_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    # user.followers.add(...) -> instance is the followed user, pk_set the followers
+    # user.following.add(...) -> instance is the follower, pk_set the followed users
+    if reverse:
+        pairs = [(instance, pk_set)]
+    else:
+        pairs = [(follower, [instance.id]) for follower in User.objects.filter(id__in=pk_set)]
+
+    for follower, author_ids in pairs:
+        if action == 'post_add':
+            backfill_timeline(follower, author_ids)
+        else:
+            prune_timeline(follower, author_ids)
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, raw, **kwargs):
+    if not raw:
+        search_backend().index(instance)
+
+@receiver(pre_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search_backend().remove(instance)
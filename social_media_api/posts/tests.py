@@ -1,3 +1,373 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+from django.urls import reverse
+from social_media_api.testing import ConstantQueriesMixin, without_ssl_redirect
+from notifications.models import Notification
+from .liked import liked_post_ids
+from .likes import like_post, like_posts
+from .models import Post, Comment, Like, SearchPosting, SearchTerm, TimelineEntry
+from .timeline import fan_out_post, timeline_posts
+from .checks import liked_posts_cache_check
+from .views import CommentViewSet
+
+User = get_user_model()
 
 # Create your tests here.
+class TimelineTestCase(TestCase):
+    def setUp(self):
+        caches['follow_graph'].clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.reader = User.objects.create_user(username="reader", password="password")
+        self.reader.follow(self.author)
+
+    def test_fan_out_writes_one_entry_per_follower(self):
+        post = Post.objects.create(author=self.author, title="Hello", content="World")
+        self.assertEqual(fan_out_post(post), 1)
+        self.assertTrue(TimelineEntry.objects.filter(owner=self.reader, post=post).exists())
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        other = User.objects.create_user(username="other", password="password")
+        post = Post.objects.create(author=other, title="Earlier", content="Post")
+        self.reader.follow(other)
+        self.assertIn(post, timeline_posts(self.reader))
+        self.reader.unfollow(other)
+        self.assertNotIn(post, timeline_posts(self.reader))
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=0)
+    def test_large_accounts_fall_back_to_fan_out_on_read(self):
+        post = Post.objects.create(author=self.author, title="Viral", content="Post")
+        self.assertEqual(fan_out_post(post), 0)
+        self.author.refresh_from_db()
+        self.assertTrue(self.author.fanout_on_read)
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(list(timeline_posts(self.reader)), [post])
+
+
+@without_ssl_redirect
+class FeedViewTestCase(APITestCase):
+    def setUp(self):
+        caches['follow_graph'].clear()
+
+    def test_created_post_appears_in_follower_feed(self):
+        author = User.objects.create_user(username="author", password="password")
+        reader = User.objects.create_user(username="reader", password="password")
+        reader.follow(author)
+
+        self.client.force_authenticate(author)
+        response = self.client.post(reverse("post-list"), {"title": "New", "content": "Post"})
+        self.assertEqual(response.status_code, 201)
+
+        self.client.force_authenticate(reader)
+        response = self.client.get(reverse("feed"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([post["title"] for post in response.data["results"]], ["New"])
+
+
+    @override_settings(TIMELINE_FANOUT_FOLLOWER_LIMIT=0)
+    def test_feed_pages_merge_fan_out_on_read_authors(self):
+        author = User.objects.create_user(username="author", password="password")
+        star = User.objects.create_user(username="star", password="password")
+        reader = User.objects.create_user(username="reader", password="password")
+        reader.follow(author)
+        reader.follow(star)
+        posts = []
+        for i in range(6):
+            post = Post.objects.create(author=star if i % 2 else author, title=f"Post {i}", content="Body")
+            if not i % 2:
+                TimelineEntry.objects.create(owner=reader, post=post, created_at=post.created_at)
+            posts.append(post)
+        fan_out_post(posts[1])  # flags star as fan-out-on-read
+
+        self.client.force_authenticate(reader)
+        seen = []
+        response = self.client.get(reverse("feed"), {"page_size": 4})
+        seen += [post["id"] for post in response.data["results"]]
+        response = self.client.get(response.data["next"])
+        seen += [post["id"] for post in response.data["results"]]
+        self.assertIsNone(response.data["next"])
+        self.assertEqual(seen, [post.id for post in reversed(posts)])
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([post["id"] for post in response.data["results"]], seen[:4])
+
+
+@without_ssl_redirect
+class KeysetPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="password")
+        self.posts = [
+            Post.objects.create(author=self.author, title=f"Post {i}", content="Body")
+            for i in range(5)
+        ]
+
+    def test_pages_are_stable_under_inserts(self):
+        response = self.client.get(reverse("post-list"), {"page_size": 2})
+        self.assertEqual([p["id"] for p in response.data["results"]], [self.posts[4].id, self.posts[3].id])
+        self.assertIsNone(response.data["previous"])
+
+        # A post created between page requests must not shift the next page
+        Post.objects.create(author=self.author, title="Late", content="Body")
+        response = self.client.get(response.data["next"])
+        self.assertEqual([p["id"] for p in response.data["results"]], [self.posts[2].id, self.posts[1].id])
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual([p["id"] for p in response.data["results"]], [self.posts[4].id, self.posts[3].id])
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(reverse("post-list"), {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+@without_ssl_redirect
+class PostSearchTestCase(APITestCase):
+    def setUp(self):
+        caches['default'].clear()
+        self.author = User.objects.create_user(username="author", password="password")
+
+    def post(self, title, content="Body"):
+        return Post.objects.create(author=self.author, title=title, content=content)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("post-list"), {"search": query, **params})
+        return response, [p["id"] for p in response.data["results"]]
+
+    def test_index_follows_saves_and_deletes(self):
+        post = self.post("Django tips", "django django orm")
+        self.assertEqual(post.search_length, 5)
+        self.assertEqual(SearchPosting.objects.get(post=post, term__term="django").frequency, 3)
+
+        post.content = "orm only"
+        post.save()
+        self.assertEqual(SearchPosting.objects.get(post=post, term__term="django").frequency, 1)
+        self.assertEqual(SearchTerm.objects.get(term="orm").document_count, 1)
+        self.assertEqual(SearchPosting.objects.filter(post=post).count(), 4)
+
+        post.delete()
+        self.assertEqual(SearchTerm.objects.get(term="django").document_count, 0)
+        self.assertEqual(self.search("django")[1], [])
+
+    def test_results_are_ranked_by_bm25(self):
+        passing = self.post("Weekend plans", "maybe some python later")
+        focused = self.post("Python", "python python generators")
+        self.post("Cooking", "nothing relevant here")
+        response, ids = self.search("python generators")
+        self.assertEqual(ids, [focused.id, passing.id])
+
+    def test_results_are_paginated_in_rank_order(self):
+        posts = [self.post(f"Post {i}", "word " * (i + 1)) for i in range(5)]
+        response, ids = self.search("word", page_size=2)
+        seen = ids
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            seen += [p["id"] for p in response.data["results"]]
+        self.assertEqual(sorted(seen), sorted(post.id for post in posts))
+        self.assertEqual(len(seen), len(set(seen)))
+
+    def test_later_pages_rank_with_the_first_page_stats(self):
+        posts = [self.post(f"Post {i}", "word " * (i + 1)) for i in range(5)]
+        response, ids = self.search("word", page_size=2)
+        # Shifts the live idf of "word", and with it every rank after the cursor
+        for i in range(3):
+            self.post(f"Late {i}", "word")
+        seen = ids
+        while response.data["next"]:
+            response = self.client.get(response.data["next"])
+            seen += [p["id"] for p in response.data["results"]]
+        original = [post.id for post in reversed(posts)]
+        self.assertEqual([post_id for post_id in seen if post_id in original], original)
+        self.assertEqual(len(seen), len(set(seen)))
+
+    @override_settings(POST_SEARCH_BACKEND="posts.search.SQLiteFTS5Backend")
+    def test_sqlite_fts5_backend(self):
+        self.post("Python", "python python generators")
+        passing = self.post("Weekend plans", "maybe some python later")
+        passing.title = "Weekend"
+        passing.save()
+        self.assertEqual(len(self.search('python "generators')[1]), 2)
+        passing.delete()
+        self.assertEqual(len(self.search("python")[1]), 1)
+
+
+@without_ssl_redirect
+class ListQueryCountTestCase(ConstantQueriesMixin, APITestCase):
+    def setUp(self):
+        caches['follow_graph'].clear()
+        caches['liked_posts'].clear()
+        caches['default'].clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.reader = User.objects.create_user(username="reader", password="password")
+        self.reader.follow(self.author)
+
+    def add_posts_with_comments(self, posts=3, comments=3):
+        for i in range(posts):
+            post = Post.objects.create(author=self.author, title=f"Post {i}", content="Body")
+            fan_out_post(post)
+            commenter = User.objects.create_user(username=f"commenter{post.id}", password="password")
+            for j in range(comments):
+                Comment.objects.create(post=post, author=commenter, content=f"Comment {j}")
+
+    def test_post_list(self):
+        self.add_posts_with_comments(posts=1)
+        # posts + authors, latest comments + their authors
+        self.assertConstantQueries(2, reverse("post-list"), self.add_posts_with_comments)
+
+    def test_feed(self):
+        self.add_posts_with_comments(posts=1)
+        self.client.force_authenticate(self.reader)
+        self.client.get(reverse("feed"))  # warm the follow-graph cache
+        # timeline keys, posts by id + authors, latest comments + their authors;
+        # the follow graph is cached
+        self.assertConstantQueries(3, reverse("feed"), self.add_posts_with_comments)
+
+    def test_comment_list(self):
+        self.add_posts_with_comments(posts=1)
+        self.assertConstantQueries(1, reverse("comment-list"), self.add_posts_with_comments)
+
+    def test_feed_with_liked_by_me(self):
+        self.add_posts_with_comments(posts=1)
+        self.client.force_authenticate(self.reader)
+        self.client.get(reverse("feed"))  # warm the follow-graph and liked-posts caches
+        # liked_by_me is answered from the reader's cached likes, with no extra query
+        self.assertConstantQueries(3, reverse("feed"), self.add_posts_with_comments)
+
+    @override_settings(POST_COMMENTS_PREVIEW_SIZE=2)
+    def test_inlined_comments_are_capped(self):
+        self.add_posts_with_comments(posts=1, comments=5)
+        response = self.client.get(reverse("post-list"))
+        self.assertEqual(len(response.data["results"][0]["comments"]), 2)
+
+
+@without_ssl_redirect
+@override_settings(NOTIFICATION_WORKERS=0)
+class PostCounterTestCase(APITestCase):
+    def setUp(self):
+        caches['liked_posts'].clear()
+        caches['default'].clear()
+        self.author = User.objects.create_user(username="author", password="password")
+        self.reader = User.objects.create_user(username="reader", password="password")
+        self.post = Post.objects.create(author=self.author, title="Counted", content="Body")
+        self.client.force_authenticate(self.reader)
+
+    def test_like_and_unlike_update_like_count(self):
+        self.client.post(reverse("like-post", kwargs={"pk": self.post.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        self.client.post(reverse("unlike-post", kwargs={"pk": self.post.pk}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 0)
+
+    def test_like_state_changes_only_once(self):
+        url = reverse("like-post", kwargs={"pk": self.post.pk})
+        self.assertEqual(self.client.post(url).status_code, 200)
+        self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(Like.objects.count(), 1)
+        self.assertEqual(Notification.objects.get().recipient, self.author)
+
+        self.client.force_authenticate(self.author)
+        self.assertEqual(self.client.post(url).data["detail"], "You cannot like your own post")
+        self.assertEqual(self.client.post(reverse("like-post", kwargs={"pk": 999999})).status_code, 404)
+
+    def test_liked_by_me(self):
+        other = Post.objects.create(author=self.author, title="Other", content="Body")
+        like_post(self.reader, self.post.pk)
+
+        response = self.client.get(reverse("post-list"))
+        liked = {post["id"]: post["liked_by_me"] for post in response.data["results"]}
+        self.assertEqual(liked, {self.post.pk: True, other.pk: False})
+
+        # Liking drops the cached ids, so the next page sees the change
+        like_post(self.reader, other.pk)
+        response = self.client.get(reverse("post-detail", kwargs={"pk": other.pk}))
+        self.assertTrue(response.data["liked_by_me"])
+
+    @override_settings(LIKED_POSTS_CACHE_SIZE=1)
+    def test_liked_by_me_beyond_cached_likes(self):
+        other = Post.objects.create(author=self.author, title="Other", content="Body")
+        like_post(self.reader, self.post.pk)
+        like_post(self.reader, other.pk)
+        self.client.get(reverse("post-list"))  # cache the single most recent like
+
+        # The older like is outside the cached ids and is found with one IN query
+        with self.assertNumQueries(1):
+            self.assertEqual(liked_post_ids(self.reader, [self.post.pk, other.pk]), {self.post.pk, other.pk})
+
+    @override_settings(LIKED_POSTS_CACHE_SIZE=1)
+    def test_cold_cache_costs_one_query(self):
+        other = Post.objects.create(author=self.author, title="Other", content="Body")
+        unliked = Post.objects.create(author=self.author, title="Unliked", content="Body")
+        like_post(self.reader, self.post.pk)
+        like_post(self.reader, other.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(liked_post_ids(self.reader, [self.post.pk, unliked.pk]), {self.post.pk})
+        # ... and leaves the most recent like cached for the next page
+        with self.assertNumQueries(0):
+            self.assertEqual(liked_post_ids(self.reader, [other.pk]), {other.pk})
+
+    def test_configured_liked_posts_cache_is_shared(self):
+        self.assertEqual(liked_posts_cache_check(None), [])
+        for backend in ("locmem.LocMemCache", "db.DatabaseCache"):
+            cache = {"BACKEND": f"django.core.cache.backends.{backend}", "LOCATION": "liked_posts_check"}
+            with self.subTest(backend=backend), override_settings(CACHES={**settings.CACHES, "liked_posts": cache}):
+                self.assertEqual([error.id for error in liked_posts_cache_check(None)], ["posts.E001"])
+
+    def test_batch_like_and_unlike(self):
+        other = Post.objects.create(author=self.author, title="Other", content="Body", like_count=1)
+        own = Post.objects.create(author=self.reader, title="Own", content="Body")
+        Like.objects.create(user=self.reader, post=other)
+        post_ids = [self.post.pk, other.pk, own.pk]
+
+        response = self.client.post(reverse("batch-like"), {"action": "like", "post_ids": post_ids}, format="json")
+        self.assertEqual(response.data, {"changed": [self.post.pk], "unchanged": sorted([other.pk, own.pk])})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.like_count, 1)
+
+        response = self.client.post(reverse("batch-like"), {"action": "unlike", "post_ids": post_ids}, format="json")
+        self.assertEqual(response.data["changed"], sorted([self.post.pk, other.pk]))
+        self.assertFalse(Like.objects.exists())
+
+    def test_batch_like_without_returning(self):
+        # MySQL has no RETURNING; new likes are told apart from a locked read instead
+        other = Post.objects.create(author=self.author, title="Other", content="Body")
+        Like.objects.create(user=self.reader, post=other)
+        features = type(connection.features)
+        with mock.patch.object(features, "can_return_rows_from_bulk_insert", new_callable=mock.PropertyMock, return_value=False):
+            self.assertEqual(like_posts(self.reader, [self.post.pk, other.pk]), {self.post.pk})
+        self.assertEqual(Like.objects.filter(user=self.reader).count(), 2)
+
+    def test_comment_create_and_delete_update_comment_count(self):
+        response = self.client.post(reverse("comment-list"), {"post_id": self.post.pk, "content": "Nice"})
+        self.assertEqual(response.status_code, 201)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        self.client.delete(reverse("comment-detail", kwargs={"pk": response.data["id"]}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_comment_deleted_twice_is_counted_once(self):
+        comment = Comment.objects.create(post=self.post, author=self.reader, content="Nice")
+        self.post.adjust_counter("comment_count", 1)
+        stale = Comment.objects.get(pk=comment.pk)
+        CommentViewSet().perform_destroy(comment)
+        CommentViewSet().perform_destroy(stale)  # lost the race to the first delete
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_reconcile_repairs_drift(self):
+        Like.objects.create(user=self.reader, post=self.post)
+        Comment.objects.create(post=self.post, author=self.reader, content="Nice")
+        Post.objects.filter(pk=self.post.pk).update(like_count=7)
+
+        out = StringIO()
+        call_command("reconcile_post_counters", batch_size=1, stdout=out)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.like_count, self.post.comment_count), (1, 1))
+        self.assertIn("repaired 1", out.getvalue())
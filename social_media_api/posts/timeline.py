@@ -0,0 +1,118 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from accounts import follow_graph
+from social_media_api.pagination import KeysetPagination
+from .models import Post, TimelineEntry
+
+# Home timeline storage.
+# Posts are fanned out on write: when a post is created its id is appended to the
+# timeline of every follower, so reading a feed is a range read over TimelineEntry.
+# Authors with a huge follower count skip the fan-out (it would write one row per
+# follower on every post) and are flagged `fanout_on_read`; their posts are merged
+# into the feed when it is read instead.
+#
+# A feed page (TimelinePagination) reads the page's (created_at, post id) keys from
+# the owner's TimelineEntry rows, in the order of the (owner, created_at, post)
+# index, and the same page from the posts of any followed fan-out-on-read authors;
+# the two short lists are merged in Python and the posts loaded by id.
+
+def fanout_follower_limit():
+    return getattr(settings, 'TIMELINE_FANOUT_FOLLOWER_LIMIT', 10000)
+
+def backfill_size():
+    return getattr(settings, 'TIMELINE_BACKFILL_SIZE', 200)
+
+FANOUT_ON_READ_KEY = 'timeline:fanout_on_read_ids'
+
+def fanout_on_read_ids():
+    # The (small) set of authors whose posts are merged at read time, cached next to
+    # the follow graph so the feed can intersect it with the reader's following set
+    ids = follow_graph.graph_cache().get(FANOUT_ON_READ_KEY)
+    if ids is None:
+        ids = frozenset(get_user_model().objects.filter(fanout_on_read=True).values_list('id', flat=True))
+        follow_graph.graph_cache().set(FANOUT_ON_READ_KEY, ids, follow_graph.timeout())
+    return ids
+
+def fan_out_post(post):
+    """Append `post` to the timeline of each of its author's followers.
+
+    Returns the number of timeline rows written (0 for fan-out-on-read authors).
+    """
+    author = post.author
+    fanout_on_read = author.followers.count() > fanout_follower_limit()
+    if fanout_on_read != author.fanout_on_read:
+        author.fanout_on_read = fanout_on_read
+        author.save(update_fields=['fanout_on_read'])
+        follow_graph.graph_cache().delete(FANOUT_ON_READ_KEY)
+    if fanout_on_read:
+        return 0
+
+    follower_ids = author.followers.values_list('id', flat=True)
+    entries = [
+        TimelineEntry(owner_id=follower_id, post_id=post.id, created_at=post.created_at)
+        for follower_id in follower_ids.iterator()
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+    return len(entries)
+
+def backfill_timeline(user, author_ids):
+    """Copy the latest posts of newly followed authors into `user`'s timeline."""
+    # Latest `limit` posts per author in one windowed query
+    recent_posts = (
+        Post.objects.filter(author_id__in=author_ids)
+        .annotate(rank=Window(RowNumber(), partition_by=F('author_id'), order_by=[F('created_at').desc(), F('id').desc()]))
+        .filter(rank__lte=backfill_size())
+        .values_list('id', 'created_at')
+    )
+    entries = [
+        TimelineEntry(owner_id=user.id, post_id=post_id, created_at=created_at)
+        for post_id, created_at in recent_posts
+    ]
+    TimelineEntry.objects.bulk_create(entries, batch_size=1000, ignore_conflicts=True)
+
+def prune_timeline(user, author_ids):
+    """Drop the posts of unfollowed authors from `user`'s timeline."""
+    TimelineEntry.objects.filter(owner=user, post__author_id__in=author_ids).delete()
+
+class TimelinePagination(KeysetPagination):
+    """Keyset pagination of the requesting user's home timeline, newest first."""
+    ordering = ('-created_at', '-id')
+    # TimelineEntry's copies of the post ordering fields
+    entry_fields = {'created_at': 'created_at', 'id': 'post_id'}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.user = request.user
+        return super().paginate_queryset(queryset, request, view)
+
+    def fetch_page(self, queryset, ordering, position, limit):
+        keys = self.timeline_keys(ordering, position, limit)
+        posts = queryset.in_bulk([post_id for _, post_id in keys])
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
+
+    def timeline_keys(self, ordering, position, limit):
+        """(created_at, post id) of the first `limit` timeline posts after `position`."""
+        entry_ordering = [
+            ('-' if field.startswith('-') else '') + self.entry_fields[field.lstrip('-')]
+            for field in ordering
+        ]
+        entries = TimelineEntry.objects.filter(owner_id=self.user.id).order_by(*entry_ordering)
+        if position is not None:
+            entries = entries.filter(self.seek_filter(entry_ordering, position))
+        keys = list(entries.values_list('created_at', 'post_id')[:limit])
+
+        merged_author_ids = follow_graph.following_ids(self.user.id) & fanout_on_read_ids()
+        if merged_author_ids:
+            posts = Post.objects.filter(author_id__in=merged_author_ids).order_by(*ordering)
+            if position is not None:
+                posts = posts.filter(self.seek_filter(ordering, position))
+            merged = set(keys) | set(posts.values_list('created_at', 'id')[:limit])
+            keys = sorted(merged, reverse=ordering[0].startswith('-'))[:limit]
+        return keys
+
+def timeline_posts(user, limit=100):
+    """The newest `limit` posts in `user`'s home timeline."""
+    pagination = TimelinePagination()
+    pagination.user = user
+    return pagination.fetch_page(Post.objects.all(), list(pagination.ordering), None, limit)
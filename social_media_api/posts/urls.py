@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet, FeedView, LikePostView, UnlikePostView
+from .views import PostViewSet, CommentViewSet, FeedView, LikePostView, UnlikePostView, BatchLikeView
 
 router = DefaultRouter()
 router.register('posts', PostViewSet, basename='post')
@@ -11,4 +11,5 @@ urlpatterns = [
     path('feed/', FeedView.as_view(), name='feed'),
     path('<int:pk>/like/', LikePostView.as_view(), name='like-post'),
     path('<int:pk>/unlike/', UnlikePostView.as_view(), name='unlike-post'),
+    path('likes/batch/', BatchLikeView.as_view(), name='batch-like'),
 ]
@@ -1,92 +1,130 @@
 # from django.shortcuts import render, get_object_or_404
+from django.conf import settings
+from django.db import transaction
 from rest_framework import viewsets, permissions, status, generics
 from .models import Post, Comment, Like
 from .serializers import PostSerializer, CommentSerializer
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from django.contrib.contenttypes.models import ContentType
-from notifications.models import Notification
+from notifications.pipeline import notify_author
+from .timeline import fan_out_post, TimelinePagination
+from .likes import like_post, unlike_post, like_posts, unlike_posts
+from .search import PostSearchFilter, SearchRankPagination
+from social_media_api.pagination import KeysetPagination
 
 # Create your views here.
 class PostViewSet(viewsets.ModelViewSet):
-    queryset = Post.objects.all().order_by('-created_at')
+    queryset = Post.objects.all().order_by('-created_at', '-id')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, SearchFilter]
-    search_fields = ['title', 'content']
+    pagination_class = KeysetPagination
+    filter_backends = [DjangoFilterBackend, PostSearchFilter]
+
+    def get_queryset(self):
+        return PostSerializer.setup_eager_loading(super().get_queryset())
+
+    @property
+    def paginator(self):
+        # Search results are paged in rank order, everything else newest first
+        if not hasattr(self, '_paginator'):
+            searching = self.action == 'list' and PostSearchFilter.terms(self.request)
+            self._paginator = SearchRankPagination() if searching else KeysetPagination()
+        return self._paginator
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        post = serializer.save(author=self.request.user)
+        fan_out_post(post)
 
 class CommentViewSet(viewsets.ModelViewSet):
-    queryset = Comment.objects.all().order_by('-created_at')
+    queryset = Comment.objects.all().order_by('-created_at', '-id')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return CommentSerializer.setup_eager_loading(super().get_queryset())
 
+    @transaction.atomic
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        comment = serializer.save(author=self.request.user)
+        comment.post.adjust_counter('comment_count', 1)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        _, deleted = instance.delete()
+        # A concurrent request may have deleted the row first; only the one
+        # whose DELETE removed it moves the counter
+        if deleted.get(Comment._meta.label):
+            instance.post.adjust_counter('comment_count', -1)
 
 # Feed Functionality View
-class FeedView(APIView):
+class FeedView(generics.ListAPIView):
+    serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # Picks the page's posts from the user's timeline and loads them by id
+    pagination_class = TimelinePagination
 
-    def get(self, request):
-        followed_users = request.user.following.all()
-        posts = Post.objects.filter(author__in=followed_users).order_by('-created_at')
-        serializer = PostSerializer(posts, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        return PostSerializer.setup_eager_loading(Post.objects.all())
 
 
 class LikePostView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        # Use generics.get_object_or_404 to get the post
-        post = generics.get_object_or_404(Post, pk=pk)
-        
-        # Ensure a user cannot like their own post
-        if request.user == post.author:
-            return Response({"detail": "You cannot like your own post"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Use Like.objects.get_or_create to either create a new like or get the existing one
-        like, created = Like.objects.get_or_create(user=request.user, post=post)
-        
-        if not created:
+        # One INSERT ... SELECT that skips existing likes and the user's own posts
+        if not like_post(request.user, pk):
+            # Nothing was inserted; only now look at the post to explain why
+            post = generics.get_object_or_404(Post, pk=pk)
+            if post.author_id == request.user.id:
+                return Response({"detail": "You cannot like your own post"}, status=status.HTTP_400_BAD_REQUEST)
             return Response({"detail": "You have already liked this post"}, status=status.HTTP_400_BAD_REQUEST)
         
-        # create notification
-        notification = Notification.objects.create(
-            recipient = post.user,
-            actor = request.user,
-            verb = "liked your post",
-            target = post,
-        )
-
-        return Response({"detail": "Post liked", "notification": notification.id}, status=status.HTTP_200_OK)
-        
-        # return Response({"detail": "Post liked successfully"}, status=status.HTTP_200_OK)
+        # queue the notification; the pipeline resolves the post's author in its batch
+        notify_author(Post, pk, actor=request.user, verb="liked your post")
+
+        return Response({"detail": "Post liked", "changed": True}, status=status.HTTP_200_OK)
     
 
 class UnlikePostView(generics.GenericAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request, pk):
-        # Use generics.get_object_or_404 to get the post
-        post = generics.get_object_or_404(Post, pk=pk)
-        
-        # Ensure a user cannot unlike their own post
-        if request.user == post.author:
-            return Response({"detail": "You cannot unlike your own post"}, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Try to get the Like object for the given post and user, and delete it
-        try:
-            like = Like.objects.get(user=request.user, post=post)
-            like.delete()
-            return Response({"detail": "Post unliked successfully"}, status=status.HTTP_200_OK)
-        except Like.DoesNotExist:
+        # One DELETE; the post is only loaded when there was nothing to delete
+        if not unlike_post(request.user, pk):
+            post = generics.get_object_or_404(Post, pk=pk)
+            if post.author_id == request.user.id:
+                return Response({"detail": "You cannot unlike your own post"}, status=status.HTTP_400_BAD_REQUEST)
             return Response({"detail": "You haven't liked this post yet"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"detail": "Post unliked successfully", "changed": True}, status=status.HTTP_200_OK)
+
+
+class BatchLikeView(generics.GenericAPIView):
+    # {"action": "like" | "unlike", "post_ids": [...]} applied in a constant number of statements
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        action = request.data.get('action')
+        post_ids = request.data.get('post_ids')
+        max_ids = getattr(settings, 'LIKE_BATCH_MAX_IDS', 100)
+        if action not in ('like', 'unlike') or not isinstance(post_ids, list):
+            return Response({"detail": "Expected action (like/unlike) and a post_ids list"}, status=status.HTTP_400_BAD_REQUEST)
+        if len(post_ids) > max_ids:
+            return Response({"detail": f"At most {max_ids} posts per request"}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            post_ids = {int(post_id) for post_id in post_ids}
+        except (TypeError, ValueError):
+            return Response({"detail": "post_ids must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if action == 'like':
+            changed = like_posts(request.user, post_ids)
+            for post_id in changed:
+                notify_author(Post, post_id, actor=request.user, verb="liked your post")
+        else:
+            changed = unlike_posts(request.user, post_ids)
+        return Response({"changed": sorted(changed), "unchanged": sorted(post_ids - changed)}, status=status.HTTP_200_OK)
 
     
 # #  views to like and unlike posts.
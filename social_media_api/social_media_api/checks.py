@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error
+
+
+def shared_cache_errors(setting, error_id):
+    """
+    Errors for the CACHES alias named by `setting` unless it is shared by every
+    process without costing a query: LocMemCache is per process, and DatabaseCache
+    turns every hit into a query.
+    """
+    alias = getattr(settings, setting, 'default')
+    cache = caches[alias]
+    if isinstance(cache, LocMemCache):
+        problem = 'a per-process LocMemCache'
+    elif isinstance(cache, DatabaseCache):
+        problem = 'a DatabaseCache, so every cache hit is a query'
+    else:
+        return []
+    return [Error(
+        f"{setting} ('{alias}') is {problem}.",
+        hint='Point it at a cache shared by all worker processes outside the database, '
+             'such as FileBasedCache (one host), Redis or Memcached.',
+        id=error_id,
+    )]
@@ -0,0 +1,174 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a fixed, unique ordering such as ('-created_at', '-id').
+
+    Each page is fetched with a `WHERE (created_at, id) < (cursor)` filter instead of an
+    OFFSET, so page 10,000 costs the same as page 1 and no COUNT(*) is run. Cursors are
+    opaque base64 tokens holding the boundary row's ordering values, which keeps pages
+    stable while new rows are being inserted at the head of the list.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+
+        position, reverse = self.decode_cursor(request)
+        ordering = self.get_ordering(reverse)
+        # Fetch one extra row to learn whether there is a further page.
+        results = self.fetch_page(queryset, ordering, position, self.page_size + 1)
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return results
+
+    def fetch_page(self, queryset, ordering, position, limit):
+        """The first `limit` rows of `queryset` in `ordering` after `position` (None: from the start)."""
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self.seek_filter(ordering, position))
+        return list(queryset[:limit])
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.query_params[self.page_size_query_param])
+                if size > 0:
+                    return min(size, self.max_page_size)
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return list(self.ordering)
+        return [field[1:] if field.startswith('-') else '-' + field for field in self.ordering]
+
+    def seek_filter(self, ordering, position):
+        # (a, b) < (x, y)  ==>  a < x OR (a = x AND b < y), for any number of columns
+        seek = Q()
+        for index in reversed(range(len(ordering))):
+            name = ordering[index].lstrip('-')
+            lookup = 'lt' if ordering[index].startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': position[index]})
+            if index < len(ordering) - 1:
+                step |= Q(**{name: position[index]}) & seek
+            seek = step
+        return seek
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def field_names(self):
+        return [field.lstrip('-') for field in self.ordering]
+
+    def cursor_extra(self):
+        """Further tokens carried by every cursor, for subclasses."""
+        return {}
+
+    def encode_cursor(self, instance, reverse):
+        tokens = {'r': '1' if reverse else '0', **self.cursor_extra()}
+        for index, name in enumerate(self.field_names()):
+            value = getattr(instance, name)
+            tokens[str(index)] = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def cursor_tokens(self, request):
+        """The tokens of the request's cursor, or None when there is no cursor."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            return parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def decode_cursor(self, request):
+        tokens = self.cursor_tokens(request)
+        if tokens is None:
+            return None, False
+        try:
+            reverse = bool(int(tokens['r'][0]))
+            position = [
+                self.to_python(name, tokens[str(index)][0])
+                for index, name in enumerate(self.field_names())
+            ]
+        except (TypeError, ValueError, KeyError, UnicodeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def to_python(self, name, value):
+        # Override for orderings on annotations, which have no model field to parse with
+        return self.model._meta.get_field(name).to_python(value)
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'The pagination cursor value.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Number of results to return per page.',
+                'schema': {'type': 'integer'},
+            },
+        ]
@@ -144,11 +144,91 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
 
+# ModelBackend, with the password check run in accounts.hashing's process pool
+AUTHENTICATION_BACKENDS = ['accounts.backends.PooledModelBackend']
+
+# Chronological lists (feed, posts, comments) use social_media_api.pagination.KeysetPagination
 REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'accounts.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE':10,
 }
 
+# Token authentication cache (accounts.authentication): per-process LRU size and
+# TTL in seconds, plus an optional CACHES alias used as a shared second tier
+TOKEN_AUTH_CACHE_SIZE = 10000
+TOKEN_AUTH_CACHE_TTL = 60
+TOKEN_AUTH_SHARED_CACHE = None
+
+# Processes hashing passwords for register/login (accounts.hashing); None means
+# one per core, 0 hashes in the request thread instead
+PASSWORD_HASHING_WORKERS = None
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Follow-graph adjacency sets (accounts.follow_graph). Follow changes are
+    # invalidated in this cache by whichever process makes them, so it must be
+    # shared by every worker process, and a warm hit must not be a query (see the
+    # accounts.E001 check). Files are shared by the workers of one host; run
+    # several hosts against Redis or Memcached instead.
+    'follow_graph': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/var/tmp/social_media_api/follow_graph',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+    # Recently liked post ids (posts.liked), dropped by whichever process records
+    # a like or unlike; shared for the same reason (see the posts.E001 check)
+    'liked_posts': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': '/var/tmp/social_media_api/liked_posts',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    },
+}
+FOLLOW_GRAPH_CACHE = 'follow_graph'
+FOLLOW_GRAPH_CACHE_TIMEOUT = 3600
+
+# Per-user cache of recently liked post ids behind PostSerializer.liked_by_me:
+# CACHES alias (shared by every worker process), how many of the most recent likes
+# each entry keeps, and TTL (see posts.liked)
+LIKED_POSTS_CACHE = 'liked_posts'
+LIKED_POSTS_CACHE_SIZE = 1000
+LIKED_POSTS_CACHE_TIMEOUT = 3600
+
+# Upper bound on user ids accepted by one bulk follow/unfollow request
+FOLLOW_BULK_MAX_IDS = 1000
+
+# Home timeline: authors above this follower count are merged into feeds at read
+# time instead of being fanned out to every follower on write
+TIMELINE_FANOUT_FOLLOWER_LIMIT = 10000
+# Number of recent posts copied into a timeline when a user follows someone
+TIMELINE_BACKFILL_SIZE = 200
+# Number of latest comments inlined with each post in list responses
+POST_COMMENTS_PREVIEW_SIZE = 10
+# Upper bound on posts liked/unliked by one batch request
+LIKE_BATCH_MAX_IDS = 100
+
+# Full-text post search (posts.search): DatabaseSearchBackend keeps its own inverted
+# index; MySQLFullTextBackend and SQLiteFTS5Backend use the database's native index
+POST_SEARCH_BACKEND = 'posts.search.DatabaseSearchBackend'
+# Seconds the corpus size/average post length used by BM25 is cached
+POST_SEARCH_STATS_TIMEOUT = 300
+
+# Notification pipeline: background writer threads per process (0 writes inline),
+# max rows per bulk write, seconds to wait while filling a batch, and the window
+# in seconds within which repeated (recipient, target, verb) events are coalesced
+NOTIFICATION_WORKERS = 2
+NOTIFICATION_BATCH_SIZE = 500
+NOTIFICATION_FLUSH_INTERVAL = 0.5
+NOTIFICATION_COALESCE_WINDOW = 3600
+# Seconds a per-user unread notification count stays in the cache
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = 86400
+
 SECURE_BROWSER_XSS_FILTER = True
 X_FRAME_OPTIONS = 'DENY'
 SECURE_CONTENT_TYPE_NOSNIFF = True
@@ -0,0 +1,33 @@
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+# The project redirects every plain-HTTP request to HTTPS (SECURE_SSL_REDIRECT), and
+# the test client speaks plain HTTP; request-level tests run with the redirect off.
+without_ssl_redirect = override_settings(SECURE_SSL_REDIRECT=False)
+
+
+class ConstantQueriesMixin:
+    """
+    Test helper for list endpoints: the number of queries per page must not depend on
+    how many rows (or related rows) the page contains.
+    """
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def assertConstantQueries(self, expected, url, add_rows, params=None):
+        """
+        Request `url`, call `add_rows()` to grow the data set, request it again and
+        assert that both requests ran exactly `expected` queries.
+        """
+        before = self.count_queries(url, params)
+        add_rows()
+        after = self.count_queries(url, params)
+        self.assertEqual(
+            (before, after), (expected, expected),
+            f"{url} ran {before} queries before and {after} after adding rows, expected {expected}",
+        )